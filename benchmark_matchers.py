@@ -0,0 +1,294 @@
+import os
+import random
+import shutil
+import tempfile
+import time
+import spacy
+from spacy.language import Language
+from spacy.matcher import Matcher
+from spacy.util import filter_spans
+from spacy.tokens import Doc, Span
+from train_test_data.test_data import TEST_DATA
+from entity_matchers import (Matchers, EntityMatcher, DEFAULT_VOCABULARIES, get_patterns_from_directory,
+                             merge_matched_entities)
+
+MATCHER_DIRECTORIES = {"modes_entity_matcher": "modes", "gesture_entity_matcher": "gestures/json",
+                       "poses_entity_matcher": "poses/json"}
+
+
+def legacy_entity_matcher(doc, label, directory):
+    """
+    The original per-Doc matcher: a new Matcher is compiled from the directory for every Doc.
+    """
+    matcher = Matcher(doc.vocab)
+    matcher.add(label, get_patterns_from_directory(directory, log_path="train_test_data/patterns_output.txt"))
+    matches = matcher(doc)
+    filtered_spans = filter_spans([doc[start:end] for _, start, end in matches])
+    if label == "MODE":
+        with doc.retokenize() as retokenizer:
+            for span in filtered_spans:
+                retokenizer.merge(span)
+        return doc
+    existing_ents = [ent for ent in doc.ents if not any(
+        ent.start <= span.start < ent.end or ent.start < span.end <= ent.end for span in filtered_spans)]
+    doc.ents = existing_ents + [Span(doc, span.start, span.end, label=label) for span in filtered_spans]
+    return doc
+
+
+@Language.component("legacy_modes_entity_matcher")
+def legacy_modes_entity_matcher(doc):
+    return legacy_entity_matcher(doc, "MODE", "modes")
+
+
+@Language.component("legacy_gesture_entity_matcher")
+def legacy_gesture_entity_matcher(doc):
+    return legacy_entity_matcher(doc, "GESTURE", "gestures/json")
+
+
+@Language.component("legacy_poses_entity_matcher")
+def legacy_poses_entity_matcher(doc):
+    return legacy_entity_matcher(doc, "POSE", "poses/json")
+
+
+@Language.factory("benchmark_entity_matcher", default_config={"label": "ENTITY", "directory": "poses/json"})
+def benchmark_entity_matcher(nlp, name, label, directory):
+    return EntityMatcher(nlp, name, label, directory)
+
+
+def build_pipeline(component_names):
+    """
+    Create a blank English pipeline with the given matcher components, so the benchmark only measures the matchers.
+    """
+    nlp = spacy.blank("en")
+    for component_name in component_names:
+        nlp.add_pipe(component_name)
+    return nlp
+
+
+def measure_docs_per_second(nlp, texts, repeats=3):
+    """
+    Run the pipeline over the texts and return the best throughput in docs per second.
+
+    Parameters:
+    - nlp (Language): The pipeline to benchmark.
+    - texts (list of str): The texts to process.
+    - repeats (int): Number of timed runs; the fastest one is reported.
+
+    Returns:
+    - The number of documents processed per second in the fastest run.
+    """
+    best_elapsed = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        for _ in nlp.pipe(texts):
+            pass
+        best_elapsed = min(best_elapsed, time.perf_counter() - start_time)
+    return len(texts) / best_elapsed
+
+
+def benchmark_compiled_matchers(texts):
+    """
+    Compare the per-Doc legacy matchers against the components that compile their patterns once.
+    """
+    legacy_nlp = build_pipeline([f"legacy_{name}" for name in MATCHER_DIRECTORIES])
+    compiled_nlp = build_pipeline(list(MATCHER_DIRECTORIES))
+
+    legacy_rate = measure_docs_per_second(legacy_nlp, texts)
+    compiled_rate = measure_docs_per_second(compiled_nlp, texts)
+
+    print("Matcher components compiled per Doc vs once per pipeline:")
+    print(f"Before: {legacy_rate:.1f} docs/sec")
+    print(f"After: {compiled_rate:.1f} docs/sec ({compiled_rate / legacy_rate:.1f}x)")
+
+
+def create_vocabularies(root_directory, count):
+    """
+    Create `count` vocabulary directories by cycling through the mode, pose and gesture file names.
+
+    Parameters:
+    - root_directory (str): Directory the vocabulary directories are created in.
+    - count (int): Number of vocabularies to create.
+
+    Returns:
+    - A dictionary mapping each vocabulary label to its directory.
+    """
+    source_directories = list(DEFAULT_VOCABULARIES.values())
+    vocabularies = {}
+    for index in range(count):
+        label = f"VOCAB{index}"
+        directory = os.path.join(root_directory, label)
+        os.makedirs(directory)
+        for filename in os.listdir(source_directories[index % len(source_directories)]):
+            if filename.endswith(".json"):
+                open(os.path.join(directory, filename), "w").close()
+        vocabularies[label] = directory
+    return vocabularies
+
+
+def measure_latency_ms(nlp, texts, repeats=3):
+    """
+    Return the mean per-Doc latency in milliseconds of the fastest run.
+    """
+    return 1000 / measure_docs_per_second(nlp, texts, repeats=repeats)
+
+
+def benchmark_vocabulary_counts(texts, vocabulary_counts=(1, 3, 10)):
+    """
+    Compare one component per vocabulary against a single multi-label component as vocabularies are added.
+    """
+    root_directory = tempfile.mkdtemp()
+    try:
+        print("Per-Doc latency, one component per vocabulary vs single pass:")
+        for count in vocabulary_counts:
+            vocabularies = create_vocabularies(os.path.join(root_directory, str(count)), count)
+
+            chained_nlp = spacy.blank("en")
+            for label, directory in vocabularies.items():
+                chained_nlp.add_pipe("benchmark_entity_matcher", name=label,
+                                     config={"label": label, "directory": directory})
+
+            single_pass_nlp = spacy.blank("en")
+            single_pass_nlp.add_pipe("vocabulary_entity_matcher", config={"vocabularies": vocabularies,
+                                                                          "label_priority": list(vocabularies)})
+
+            chained_latency = measure_latency_ms(chained_nlp, texts)
+            single_pass_latency = measure_latency_ms(single_pass_nlp, texts)
+            print(f"{count} vocabularies: chained {chained_latency:.3f} ms/doc, "
+                  f"single pass {single_pass_latency:.3f} ms/doc")
+    finally:
+        shutil.rmtree(root_directory)
+
+
+def random_spans(doc, count, label, rng):
+    """
+    Create `count` random non-overlapping spans of 1-4 tokens over the Doc.
+    """
+    spans = []
+    taken = set()
+    while len(spans) < count:
+        start = rng.randrange(len(doc) - 4)
+        end = start + rng.randint(1, 4)
+        if not taken.intersection(range(start, end)):
+            taken.update(range(start, end))
+            spans.append(Span(doc, start, end, label=label))
+    return spans
+
+
+def quadratic_merge(existing_ents, matched_spans):
+    """
+    The pairwise overlap check the matchers used before merge_matched_entities, as a reference.
+    """
+    kept_ents = [ent for ent in existing_ents if not any(
+        ent.start < span.end and span.start < ent.end for span in matched_spans)]
+    return sorted(kept_ents + list(matched_spans), key=lambda span: span.start)
+
+
+def stress_test_entity_merge(token_count=10000, entity_counts=(100, 300, 900), seed=0):
+    """
+    Check merge_matched_entities against the pairwise reference on long synthetic Docs and time both.
+    """
+    rng = random.Random(seed)
+    vocab = spacy.blank("en").vocab
+    print(f"Entity merge on {token_count}-token Docs, pairwise vs sorted sweep:")
+    for entity_count in entity_counts:
+        doc = Doc(vocab, words=[f"word{rng.randrange(500)}" for _ in range(token_count)])
+        doc.ents = random_spans(doc, entity_count, "ACTION", rng)
+        matched_spans = random_spans(doc, entity_count, "POSE", rng)
+
+        start_time = time.perf_counter()
+        expected = quadratic_merge(doc.ents, matched_spans)
+        quadratic_elapsed = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        merged = merge_matched_entities(doc.ents, matched_spans)
+        sweep_elapsed = time.perf_counter() - start_time
+
+        assert [(span.start, span.end, span.label_) for span in merged] == \
+            [(span.start, span.end, span.label_) for span in expected]
+        doc.ents = merged  # Raises if the merged entities overlap
+        print(f"{entity_count} entities per side: pairwise {quadratic_elapsed * 1000:.2f} ms, "
+              f"sweep {sweep_elapsed * 1000:.2f} ms")
+
+
+def benchmark_hot_reload(texts, file_counts=(40, 1000, 10000), poll_interval=1.0):
+    """
+    Show that the per-Doc cost does not grow with the vocabulary directory size and measure how long a
+    newly added file takes to be matched.
+    """
+    root_directory = tempfile.mkdtemp()
+    try:
+        print(f"Hot-reloaded vocabularies (poll interval {poll_interval}s):")
+        for file_count in file_counts:
+            directory = os.path.join(root_directory, str(file_count))
+            os.makedirs(directory)
+            for index in range(file_count):
+                open(os.path.join(directory, f"pose_{index}.json"), "w").close()
+
+            nlp = spacy.blank("en")
+            nlp.add_pipe("vocabulary_entity_matcher", config={"vocabularies": {"POSE": directory},
+                                                              "poll_interval": poll_interval})
+            latency = measure_latency_ms(nlp, texts)
+
+            open(os.path.join(directory, "star_jump.json"), "w").close()
+            added_time = time.perf_counter()
+            while not nlp("do a star jump").ents:
+                time.sleep(0.01)
+            visible_after = time.perf_counter() - added_time
+            print(f"{file_count} files: {latency:.3f} ms/doc, new file matched after {visible_after:.2f}s")
+    finally:
+        shutil.rmtree(root_directory)
+
+
+def create_synthetic_names(directory, name_count, rng, word_count=2000):
+    """
+    Fill a directory with empty JSON files named after `name_count` random 1-3 word entity names.
+
+    Returns:
+    - The list of entity names created.
+    """
+    words = [f"w{index}" for index in range(word_count)]
+    names = set()
+    while len(names) < name_count:
+        names.add(" ".join(rng.choice(words) for _ in range(rng.randint(1, 3))))
+    os.makedirs(directory)
+    for name in names:
+        open(os.path.join(directory, name.replace(" ", "_") + ".json"), "w").close()
+    return sorted(names)
+
+
+def benchmark_trie_scaling(texts, name_counts=(40, 500, 5000, 50000), seed=0):
+    """
+    Compare the per-Doc latency of the token Matcher built from get_patterns_from_directory with the
+    trie-based longest-match component as the number of entity names grows.
+    """
+    rng = random.Random(seed)
+    root_directory = tempfile.mkdtemp()
+    try:
+        print("Per-Doc latency by number of entity names, token Matcher vs trie:")
+        for name_count in name_counts:
+            directory = os.path.join(root_directory, str(name_count))
+            names = create_synthetic_names(directory, name_count, rng)
+            # Mention a few entity names in every utterance
+            documents = [f"{text} then {rng.choice(names)} and {rng.choice(names)}" for text in texts]
+
+            matcher_nlp = spacy.blank("en")
+            matcher_nlp.add_pipe("benchmark_entity_matcher", config={"label": "POSE", "directory": directory})
+            trie_nlp = spacy.blank("en")
+            trie_nlp.add_pipe("trie_entity_matcher", config={"vocabularies": {"POSE": directory},
+                                                             "label_priority": ["POSE"]})
+
+            matcher_latency = measure_latency_ms(matcher_nlp, documents)
+            trie_latency = measure_latency_ms(trie_nlp, documents)
+            print(f"{name_count} names: Matcher {matcher_latency:.3f} ms/doc, trie {trie_latency:.3f} ms/doc")
+    finally:
+        shutil.rmtree(root_directory)
+
+
+if __name__ == "__main__":
+    # Repeat the test sentences to get a few thousand utterances
+    texts = [text for text, _ in TEST_DATA] * 50
+    benchmark_compiled_matchers(texts)
+    benchmark_vocabulary_counts(texts)
+    stress_test_entity_merge()
+    benchmark_hot_reload(texts)
+    benchmark_trie_scaling(texts)
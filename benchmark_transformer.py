@@ -0,0 +1,500 @@
+import os
+import csv
+import sys
+import time
+import asyncio
+import subprocess
+import numpy as np
+from embedding_index import (EMBEDDING_PRECISIONS, PROJECTION_METHODS, CompactEmbeddings, EmbeddingProjection,
+                             ExactSearchIndex, IVFSearchIndex, normalize_embeddings, read_catalog_entries,
+                             read_catalog_sources)
+
+
+def synthetic_catalog(entry_count, dimension=384, cluster_count=2000, noise=1.0, seed=0):
+    """
+    Create a clustered catalog of unit-length embeddings, standing in for control and entity name embeddings.
+
+    Returns:
+    - A tuple (embeddings, cluster centers) of float32 matrices.
+    """
+    rng = np.random.default_rng(seed)
+    centers = normalize_embeddings(rng.normal(size=(cluster_count, dimension)))
+    members = rng.integers(cluster_count, size=entry_count)
+    embeddings = centers[members] + noise * rng.normal(size=(entry_count, dimension)).astype(np.float32) / np.sqrt(dimension)
+    return normalize_embeddings(embeddings), centers
+
+
+def synthetic_queries(embeddings, query_count, noise=1.0, seed=1):
+    """
+    Create queries as noisy copies of random catalog entries, like paraphrased action phrases.
+    """
+    rng = np.random.default_rng(seed)
+    dimension = embeddings.shape[1]
+    picked = embeddings[rng.integers(len(embeddings), size=query_count)]
+    return normalize_embeddings(picked + noise * rng.normal(size=picked.shape).astype(np.float32) / np.sqrt(dimension))
+
+
+def recall_at_k(exact_indices, approximate_indices):
+    """
+    Return the fraction of the exact top-k results that the approximate search also returned.
+    """
+    found = sum(len(set(exact) & set(approximate)) for exact, approximate in zip(exact_indices, approximate_indices))
+    return found / exact_indices.size
+
+
+def time_search(index, queries, top_k):
+    """
+    Search the queries one at a time, as utterances arrive, and return the results and mean latency in ms.
+    """
+    indices = []
+    start_time = time.perf_counter()
+    for query in queries:
+        query_indices, _ = index.search(query, top_k=top_k)
+        indices.append(query_indices[0])
+    return np.array(indices), (time.perf_counter() - start_time) * 1000 / len(queries)
+
+
+def benchmark_ann_backends(entry_count=100000, query_count=200, top_k=10, probe_counts=(4, 8, 16, 32)):
+    """
+    Report recall@k and per-query latency of the IVF backend against exact search on a synthetic catalog.
+    """
+    embeddings, _ = synthetic_catalog(entry_count)
+    queries = synthetic_queries(embeddings, query_count)
+    embeddings = CompactEmbeddings.from_float(embeddings)
+
+    exact_indices, exact_latency = time_search(ExactSearchIndex(embeddings), queries, top_k)
+    print(f"Catalog of {entry_count} entries, top {top_k}:")
+    print(f"exact: recall@{top_k} 1.000, {exact_latency:.3f} ms/query")
+
+    start_time = time.perf_counter()
+    ivf_index = IVFSearchIndex(embeddings)
+    print(f"ivf: {len(ivf_index.centroids)} lists built in {time.perf_counter() - start_time:.1f}s")
+    for n_probe in probe_counts:
+        ivf_index.n_probe = n_probe
+        ivf_indices, ivf_latency = time_search(ivf_index, queries, top_k)
+        print(f"ivf n_probe={n_probe}: recall@{top_k} {recall_at_k(exact_indices, ivf_indices):.3f}, "
+              f"{ivf_latency:.3f} ms/query")
+
+
+def read_sentence_pairs(csv_path="train_test_data/transformer_sentences.csv"):
+    """
+    Read the (sentence1, sentence2) pairs of the transformer training data.
+    """
+    with open(csv_path, 'r', newline='') as f:
+        return [(row["sentence1"], row["sentence2"]) for row in csv.DictReader(f, skipinitialspace=True)]
+
+
+def decision_target_sets(csv_path="train_test_data/transformer_sentences.csv", modes_directory="modes"):
+    """
+    Return the sentence1 queries of the training data and the target sets they are matched against: the
+    sentence2 phrases, then the controls of each mode.
+    """
+    pairs = read_sentence_pairs(csv_path)
+    target_sets = {"transformer_sentences": sorted({sentence2 for _, sentence2 in pairs})}
+    for filename in sorted(os.listdir(modes_directory)):
+        if filename.endswith(".json"):
+            controls = [entry["text"] for entry in read_catalog_entries(os.path.join(modes_directory, filename), "mode")]
+            if controls:
+                target_sets[filename[:-5]] = controls
+    return [sentence1 for sentence1, _ in pairs], target_sets
+
+
+def check_quantized_decisions(model_path="transformer_model", csv_path="train_test_data/transformer_sentences.csv",
+                              modes_directory="modes", similarity_threshold=0.8):
+    """
+    Check that float16 and int8 target embeddings give the same best-match decisions as float32 at the
+    similarity threshold, for the training sentences and for the controls of every mode.
+    """
+    from transformer import NamedEntityMatcher
+
+    matcher = NamedEntityMatcher(model_path, similarity_threshold=similarity_threshold, cache_dir=None)
+    queries, target_sets = decision_target_sets(csv_path, modes_directory)
+    query_embeddings = matcher.encode_queries(queries)
+
+    changed = {precision: 0 for precision in EMBEDDING_PRECISIONS}
+    max_error = {precision: 0.0 for precision in EMBEDDING_PRECISIONS}
+    decisions = 0
+    for targets in target_sets.values():
+        target_embeddings = matcher.encode_controls(targets)
+        expected = matcher.find_best_match(query_embeddings, target_embeddings)
+        expected_scores = matcher.similarity_matrix(query_embeddings, target_embeddings)
+        decisions += len(queries)
+        for precision in EMBEDDING_PRECISIONS:
+            compact = CompactEmbeddings.from_float(target_embeddings, precision)
+            matched = matcher.find_best_match(query_embeddings, compact)
+            changed[precision] += sum(expected.get(idx, (None,))[0] != matched.get(idx, (None,))[0]
+                                      for idx in range(len(queries)))
+            max_error[precision] = max(max_error[precision], float(np.abs(
+                matcher.similarity_matrix(query_embeddings, compact) - expected_scores).max()))
+
+    print(f"Best-match decisions at threshold {similarity_threshold} over {len(target_sets)} target sets:")
+    for precision in EMBEDDING_PRECISIONS:
+        bytes_per_dimension = np.dtype(precision).itemsize
+        print(f"{precision}: {changed[precision]}/{decisions} decisions changed, max score error "
+              f"{max_error[precision]:.5f}, {bytes_per_dimension} byte(s) per dimension")
+    return changed
+
+
+MODEL_LOADING_SCRIPT = """
+import time
+start_time = time.perf_counter()
+from transformer import NamedEntityMatcher
+import_seconds = time.perf_counter() - start_time
+matcher = NamedEntityMatcher({model_path!r}, cache_dir=None, warmup={warmup})
+time.sleep({startup_seconds})  # The rest of the application starting up
+match_start_time = time.perf_counter()
+matcher.match_actions_to_controls("modes", {mode_name!r}, ["move the mouse with my hand"])
+now = time.perf_counter()
+print(import_seconds, now - match_start_time, now - start_time)
+"""
+
+
+def benchmark_model_loading(model_path="transformer_model", mode_name="tetris", startup_seconds=3.0):
+    """
+    Report the import time of the transformer module and the time to the first match, with the model loaded
+    on first use and with a background warmup running while the rest of the application starts. Every
+    measurement runs in a fresh interpreter so nothing is already imported.
+    """
+    def run(code):
+        return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+
+    start_time = time.perf_counter()
+    run("import sentence_transformers")
+    print(f"import sentence_transformers (previously paid on import): {time.perf_counter() - start_time:.2f}s")
+
+    print(f"Time to first match, {startup_seconds:.1f}s of other startup work after construction:")
+    for warmup in (False, True):
+        import_seconds, first_match_seconds, total_seconds = map(float, run(MODEL_LOADING_SCRIPT.format(
+            model_path=model_path, warmup=warmup, startup_seconds=startup_seconds, mode_name=mode_name)).split())
+        print(f"{'background warmup' if warmup else 'load on first use'}: import transformer {import_seconds:.3f}s, "
+              f"first match {first_match_seconds:.3f}s, total {total_seconds:.2f}s")
+
+
+def time_encode(encoder, phrases, repeats=20):
+    """
+    Return the fastest of `repeats` encodes of the phrases in milliseconds, with a SentenceTransformer or
+    with a NamedEntityMatcher.
+    """
+    encode = encoder.encode_texts if hasattr(encoder, "encode_texts") else encoder.encode
+    best_elapsed = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        encode(phrases)
+        best_elapsed = min(best_elapsed, time.perf_counter() - start_time)
+    return best_elapsed * 1000
+
+
+def benchmark_inference_modes(model_path="transformer_model", phrase_counts=(1, 8, 64), num_threads=None,
+                              similarity_threshold=0.8):
+    """
+    Compare the encode latency of the float and dynamically quantized models for batches of phrases, and the
+    agreement of their best-match decisions on the training sentences and the mode controls.
+    """
+    from transformer import NamedEntityMatcher
+
+    matchers = {mode: NamedEntityMatcher(model_path, similarity_threshold=similarity_threshold, cache_dir=None,
+                                         inference_mode=mode, num_threads=num_threads)
+                for mode in ("float", "quantized")}
+    queries, target_sets = decision_target_sets()
+    phrases = queries + [target for targets in target_sets.values() for target in targets]
+
+    print(f"Encode latency by batch size ({num_threads or 'default'} threads):")
+    for phrase_count in phrase_counts:
+        batch = [phrases[index % len(phrases)] for index in range(phrase_count)]
+        latencies = {mode: time_encode(matcher.model, batch) for mode, matcher in matchers.items()}
+        print(f"{phrase_count} phrases: float {latencies['float']:.1f} ms, quantized {latencies['quantized']:.1f} ms "
+              f"({latencies['float'] / latencies['quantized']:.1f}x)")
+
+    agreed = decisions = 0
+    for targets in target_sets.values():
+        results = {mode: matcher.find_best_match(matcher.encode_queries(queries), matcher.encode_controls(targets))
+                   for mode, matcher in matchers.items()}
+        agreed += sum(results["float"].get(idx, (None,))[0] == results["quantized"].get(idx, (None,))[0]
+                      for idx in range(len(queries)))
+        decisions += len(queries)
+    print(f"Best-match agreement at threshold {similarity_threshold}: {agreed}/{decisions}")
+
+
+def benchmark_micro_batching(model_path="transformer_model", mode_name="tetris", request_count=256,
+                             producer_count=32):
+    """
+    Compare serial match_actions_to_controls calls with concurrent amatch calls from several producers, each
+    request holding one new action phrase so every call has to encode.
+    """
+    from transformer import NamedEntityMatcher
+
+    queries, _ = decision_target_sets()
+    phrases = [f"{queries[index % len(queries)]} {index}" for index in range(request_count)]
+
+    serial_matcher = NamedEntityMatcher(model_path, cache_dir=None, query_cache_size=0)
+    serial_matcher.match_actions_to_controls("modes", mode_name, ["warm up"])
+    start_time = time.perf_counter()
+    serial_results = [serial_matcher.match_actions_to_controls("modes", mode_name, [phrase]) for phrase in phrases]
+    serial_rate = request_count / (time.perf_counter() - start_time)
+
+    batched_matcher = NamedEntityMatcher(model_path, cache_dir=None, query_cache_size=0)
+    batched_matcher.match_actions_to_controls("modes", mode_name, ["warm up"])
+
+    async def producer(producer_phrases):
+        return [await batched_matcher.amatch("modes", mode_name, [phrase]) for phrase in producer_phrases]
+
+    async def run_producers():
+        # Every producer sends its share of the phrases one request at a time
+        return await asyncio.gather(*(producer(phrases[index::producer_count]) for index in range(producer_count)))
+
+    start_time = time.perf_counter()
+    producer_results = asyncio.run(run_producers())
+    batched_rate = request_count / (time.perf_counter() - start_time)
+    batched_results = [None] * request_count
+    for index, results in enumerate(producer_results):
+        batched_results[index::producer_count] = results
+
+    agreed = sum(serial.keys() == batched.keys() and all(serial[action][0] == batched[action][0] for action in serial)
+                 for serial, batched in zip(serial_results, batched_results))
+    stats = batched_matcher.dispatcher_stats()
+    print(f"{request_count} single-phrase requests, {producer_count} concurrent producers:")
+    print(f"serial: {serial_rate:.1f} requests/sec")
+    print(f"amatch: {batched_rate:.1f} requests/sec ({batched_rate / serial_rate:.1f}x), "
+          f"{stats['batches']} batches of {stats['mean_batch_phrases']:.1f} phrases, latency p50 "
+          f"{stats['latency_p50_ms']:.1f} ms p95 {stats['latency_p95_ms']:.1f} ms, {agreed}/{request_count} results equal")
+
+
+def benchmark_length_buckets(model_path="transformer_model", batch_sizes=(16, 64, 256), long_share=0.05, seed=0):
+    """
+    Compare encoding mixed-length batches, mostly short controls with a few long dictated sentences, as a whole
+    and bucketed by token length.
+    """
+    from transformer import NamedEntityMatcher
+
+    rng = np.random.default_rng(seed)
+    queries, target_sets = decision_target_sets()
+    short_phrases = [target for targets in target_sets.values() for target in targets]
+    long_sentence = " ".join(queries * 4)
+
+    matcher = NamedEntityMatcher(model_path, cache_dir=None)
+    print(f"Mixed-length encodes, {long_share:.0%} long sentences:")
+    for batch_size in batch_sizes:
+        texts = [long_sentence if rng.random() < long_share else short_phrases[rng.integers(len(short_phrases))]
+                 for _ in range(batch_size)]
+        texts[0] = long_sentence  # At least one long sentence per batch
+
+        matcher.length_buckets = None
+        whole_latency = time_encode(matcher, texts, repeats=5)
+        whole_embeddings = matcher.encode_texts(texts)
+        matcher.length_buckets = (8, 16, 32)
+        bucketed_latency = time_encode(matcher, texts, repeats=5)
+        max_error = np.abs(matcher.encode_texts(texts) - whole_embeddings).max()
+        print(f"{batch_size} texts: whole {whole_latency:.1f} ms, bucketed {bucketed_latency:.1f} ms "
+              f"({whole_latency / bucketed_latency:.1f}x), max embedding difference {max_error:.2e}")
+
+
+def test_action_phrases():
+    """
+    Return the unique ACTION entity texts of the test utterances.
+    """
+    from train_test_data.test_data import TEST_DATA
+
+    return list(dict.fromkeys(text[start:end] for text, annotations in TEST_DATA
+                              for start, end, label in annotations["entities"] if label == "ACTION"))
+
+
+def benchmark_static_cascade(model_path="transformer_model", static_vectors="en_core_web_md", repeats=3):
+    """
+    Report how often the word-vector stage falls back to the transformer on the test utterance actions and the
+    training sentences, the latency saved against the transformer alone and how often both agree.
+    """
+    from transformer import NamedEntityMatcher
+
+    queries, target_sets = decision_target_sets()
+    mode_names = [name for name in target_sets if name != "transformer_sentences"]
+    actions = list(dict.fromkeys(test_action_phrases() + queries))
+    # The query cache is disabled so every repeat pays for the encodes the cascade avoids
+    matchers = {"transformer": NamedEntityMatcher(model_path, cache_dir=None, query_cache_size=0),
+                "cascade": NamedEntityMatcher(model_path, cache_dir=None, query_cache_size=0,
+                                              static_vectors=static_vectors)}
+
+    latencies = {}
+    results = {}
+    for name, matcher in matchers.items():
+        for mode_name in mode_names:
+            matcher.match_actions_to_controls("modes", mode_name, ["warm up"])
+        matcher.static_match_count = matcher.fallback_count = 0
+        best_elapsed = float("inf")
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            results[name] = [matcher.match_actions_to_controls("modes", mode_name, actions) for mode_name in mode_names]
+            best_elapsed = min(best_elapsed, time.perf_counter() - start_time)
+        latencies[name] = best_elapsed * 1000
+
+    stats = matchers["cascade"].cascade_stats()
+    decisions = agreed = 0
+    for transformer_results, cascade_results in zip(results["transformer"], results["cascade"]):
+        for action in actions:
+            decisions += 1
+            agreed += transformer_results.get(action, (None,))[0] == cascade_results.get(action, (None,))[0]
+    print(f"Static word-vector cascade on {len(actions)} action phrases:")
+    print(f"fallback rate {stats['fallback_rate']:.1%} ({stats['fallbacks'] // repeats} of "
+          f"{(stats['static_matches'] + stats['fallbacks']) // repeats} actions per run)")
+    print(f"transformer only {latencies['transformer']:.1f} ms, cascade {latencies['cascade']:.1f} ms "
+          f"({latencies['transformer'] - latencies['cascade']:.1f} ms saved), {agreed}/{decisions} decisions agree")
+
+
+def top_1_agreement(catalog, queries, projection):
+    """
+    Return the fraction of queries whose best catalog entry is the same with and without the projection.
+    """
+    full_best = (normalize_embeddings(queries) @ normalize_embeddings(catalog).T).argmax(axis=1)
+    reduced_best = (projection.apply(queries) @ projection.apply(catalog).T).argmax(axis=1)
+    return float((full_best == reduced_best).mean())
+
+
+def benchmark_projection(model_path="transformer_model", dimensions=(32, 64, 128), entry_count=100000,
+                         query_count=200):
+    """
+    Report the top-1 agreement with the full embeddings of PCA and random projections fitted on the catalog, and
+    the exact search latency of each dimension on a synthetic catalog.
+    """
+    from transformer import NamedEntityMatcher
+
+    matcher = NamedEntityMatcher(model_path, cache_dir=None)
+    texts = [entry["text"] for source, (kind, _) in read_catalog_sources().items()
+             for entry in read_catalog_entries(source, kind)]
+    catalog = matcher.encode_controls(texts)
+    queries, _ = decision_target_sets()
+    query_embeddings = matcher.encode_queries(list(dict.fromkeys(test_action_phrases() + queries)))
+
+    synthetic, _ = synthetic_catalog(entry_count)
+    synthetic_query_embeddings = synthetic_queries(synthetic, query_count)
+    _, full_latency = time_search(ExactSearchIndex(CompactEmbeddings.from_float(synthetic)),
+                                  synthetic_query_embeddings, 1)
+
+    print(f"Dimensionality reduction of the {len(texts)}-entry catalog, top-1 agreement with "
+          f"{catalog.shape[1]} dimensions, and search latency on {entry_count} synthetic entries:")
+    print(f"{catalog.shape[1]} dimensions: {full_latency:.3f} ms/query")
+    for dimension in dimensions:
+        for method in PROJECTION_METHODS:
+            agreement = top_1_agreement(catalog, query_embeddings, EmbeddingProjection.fit(catalog, dimension, method))
+            synthetic_projection = EmbeddingProjection.fit(synthetic, dimension, method)
+            reduced_queries = synthetic_projection.apply(synthetic_query_embeddings)
+            _, latency = time_search(ExactSearchIndex(CompactEmbeddings.from_float(synthetic_projection.apply(synthetic))),
+                                     reduced_queries, 1)
+            synthetic_agreement = top_1_agreement(synthetic, synthetic_query_embeddings, synthetic_projection)
+            print(f"{method} {dimension}: catalog agreement {agreement:.3f}, synthetic agreement "
+                  f"{synthetic_agreement:.3f}, {latency:.3f} ms/query ({full_latency / latency:.1f}x)")
+
+
+def test_entities(labels=("POSE", "GESTURE")):
+    """
+    Return the unique (text, label) entities of the given labels in the test utterances.
+    """
+    from train_test_data.test_data import TEST_DATA
+
+    return list(dict.fromkeys((text[start:end], label) for text, annotations in TEST_DATA
+                              for start, end, label in annotations["entities"] if label in labels))
+
+
+def benchmark_entity_resolver(model_path="transformer_model", copies=20):
+    """
+    Resolve the pose and gesture entities of the test utterances, with case and spacing variants, one at a
+    time with the transformer, in one bulk pass, and again from the persisted map.
+    """
+    import tempfile
+    from transformer import NamedEntityMatcher
+    from entity_resolver import DEFAULT_ENTITY_DIRECTORIES, EntityResolver, normalize_entity_text
+
+    entities = test_entities()
+    variants = [(f"{text.upper() if copy % 2 else text}{' ' * (copy % 3)} {copy}" if copy else text, label)
+                for copy in range(copies) for text, label in entities]
+    texts = [text for text, _ in variants]
+    labels = [label for _, label in variants]
+    map_path = os.path.join(tempfile.mkdtemp(), "entity_file_map.json")
+
+    matcher = NamedEntityMatcher(model_path, cache_dir=None, query_cache_size=0)
+    matcher.encode_queries(["warm up"])
+    start_time = time.perf_counter()
+    for text, label in variants:
+        names = [normalize_entity_text(filename[:-5]) for filename in os.listdir(DEFAULT_ENTITY_DIRECTORIES[label])]
+        matcher.find_best_match(matcher.encode_queries([text]), matcher.encode_controls(names))
+    per_call_seconds = time.perf_counter() - start_time
+
+    resolver = EntityResolver(matcher, map_path=map_path)
+    start_time = time.perf_counter()
+    resolved = resolver.resolve_many(texts, labels)
+    bulk_seconds = time.perf_counter() - start_time
+
+    reloaded = EntityResolver(matcher, map_path=map_path)
+    start_time = time.perf_counter()
+    for text, label in variants:
+        reloaded.resolve(text, label)
+    lookup_seconds = time.perf_counter() - start_time
+
+    print(f"Resolving {len(variants)} pose and gesture entities ({len(entities)} distinct):")
+    print(f"one transformer search per entity: {per_call_seconds * 1000:.1f} ms")
+    print(f"bulk resolve_many: {bulk_seconds * 1000:.1f} ms, {sum(result is not None for result in resolved)} "
+          f"resolved, {resolver.misses} searched")
+    print(f"persisted map lookups: {lookup_seconds * 1000:.2f} ms, hit rate {reloaded.stats()['hit_rate']:.2f}")
+
+
+def parse_controls(directory, mode_name):
+    """
+    The original load_controls_from_json body, parsing the mode file on every call, as a reference.
+    """
+    import json
+
+    with open(os.path.join(directory, f"{mode_name}.json"), 'r') as f:
+        data = json.load(f)
+    return [pose['control'] for pose in data.get('poses', []) if 'control' in pose]
+
+
+def benchmark_mode_registry(directory="modes", mode_name="tetris", lookups=10000, copies=50):
+    """
+    Compare parsing a mode file on every lookup with the ModeRegistry, and a serial with a parallel bulk load
+    of a directory of mode files.
+    """
+    import shutil
+    import tempfile
+    from mode_registry import ModeRegistry
+
+    start_time = time.perf_counter()
+    for _ in range(lookups):
+        expected = parse_controls(directory, mode_name)
+    parse_us = (time.perf_counter() - start_time) * 1e6 / lookups
+
+    registry = ModeRegistry(directory)
+    start_time = time.perf_counter()
+    for _ in range(lookups):
+        controls = registry.controls(mode_name)
+    registry_us = (time.perf_counter() - start_time) * 1e6 / lookups
+    assert controls == expected
+
+    # A larger directory made of copies of the mode files, standing in for a user's collection
+    root_directory = tempfile.mkdtemp()
+    try:
+        for copy in range(copies):
+            for filename in os.listdir(directory):
+                shutil.copy(os.path.join(directory, filename), os.path.join(root_directory, f"{copy}_{filename}"))
+        bulk_ms = {}
+        for max_workers in (1, 8):
+            start_time = time.perf_counter()
+            ModeRegistry(root_directory).load_all(max_workers=max_workers)
+            bulk_ms[max_workers] = (time.perf_counter() - start_time) * 1000
+    finally:
+        shutil.rmtree(root_directory)
+
+    print(f"Controls of '{mode_name}': parsed per call {parse_us:.1f} us, registry {registry_us:.1f} us "
+          f"({parse_us / registry_us:.1f}x)")
+    print(f"Bulk load of {copies * len(os.listdir(directory))} mode files: 1 worker {bulk_ms[1]:.1f} ms, "
+          f"8 workers {bulk_ms[8]:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_ann_backends()
+    check_quantized_decisions()
+    benchmark_model_loading()
+    benchmark_inference_modes()
+    benchmark_micro_batching()
+    benchmark_length_buckets()
+    benchmark_static_cascade()
+    benchmark_projection()
+    benchmark_entity_resolver()
+    benchmark_mode_registry()
@@ -0,0 +1,172 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from embedding_index import save_array
+
+
+def model_identity(model_path):
+    """
+    Compute an identifier of a model directory that changes whenever any of its files changes.
+
+    Parameters:
+    - model_path (str): Path to the model directory, or the name of a model that is not a local directory,
+      such as a hub name.
+
+    Returns:
+    - Hex digest of the relative path, size and modification time of every file in the directory, or of the
+      model name if it is not a local directory.
+    """
+    digest = hashlib.sha256()
+    if not os.path.isdir(model_path):
+        digest.update(f"name:{model_path}".encode("utf8"))
+        return digest.hexdigest()
+    for root, _, filenames in sorted(os.walk(model_path)):
+        for filename in sorted(filenames):
+            file_path = os.path.join(root, filename)
+            stat = os.stat(file_path)
+            digest.update(f"{os.path.relpath(file_path, model_path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    A content-addressed cache of text embeddings with an in-memory LRU tier and an on-disk .npy tier.
+
+    Entries are keyed by the hash of the model identity and the text, so embeddings of a retrained
+    model never mix with older ones. The cache can be shared between threads.
+    """
+
+    def __init__(self, model_id, cache_dir=None, max_entries=10000, max_disk_entries=100000):
+        """
+        Initialize the EmbeddingCache class.
+
+        Parameters:
+        - model_id (str): Identity of the model producing the embeddings, e.g. from model_identity.
+        - cache_dir (str): Directory of the on-disk tier. The cache is memory-only when None.
+        - max_entries (int): Maximum number of embeddings kept in memory.
+        - max_disk_entries (int): Maximum number of embeddings kept on disk.
+        """
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+        self.cache_dir = None
+        if cache_dir is not None:
+            self.cache_dir = os.path.join(cache_dir, model_id[:16])
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_entries = sum(1 for filename in os.listdir(self.cache_dir) if filename.endswith(".npy"))
+
+    def key(self, text):
+        """
+        Return the content address of a text for this cache's model.
+        """
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode("utf8")).hexdigest()
+
+    def get(self, text):
+        """
+        Look up the embedding of a text, first in memory and then on disk.
+
+        Returns:
+        - The embedding as a numpy array, or None if the text is not cached.
+        """
+        key = self.key(text)
+        with self._lock:
+            embedding = self.memory.get(key)
+            if embedding is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+            if self.cache_dir is not None:
+                file_path = os.path.join(self.cache_dir, f"{key}.npy")
+                if os.path.exists(file_path):
+                    try:
+                        embedding = np.load(file_path)
+                        os.utime(file_path)  # Mark the entry as recently used for disk eviction
+                    except (OSError, ValueError, EOFError):
+                        # An unreadable entry, e.g. from a crashed writer, is dropped and encoded again
+                        embedding = None
+                        self._remove_from_disk(file_path)
+                    if embedding is not None:
+                        self._store_in_memory(key, embedding)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return embedding
+
+            self.misses += 1
+            return None
+
+    def put(self, text, embedding):
+        """
+        Store the embedding of a text in both tiers.
+        """
+        key = self.key(text)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._store_in_memory(key, embedding)
+
+            if self.cache_dir is not None:
+                file_path = os.path.join(self.cache_dir, f"{key}.npy")
+                if not os.path.exists(file_path):
+                    save_array(file_path, embedding)
+                    self._disk_entries += 1
+                    if self._disk_entries > self.max_disk_entries:
+                        self._evict_from_disk()
+
+    def get_many(self, texts):
+        """
+        Look up several texts at once.
+
+        Returns:
+        - A list with the cached embedding or None for each text.
+        """
+        return [self.get(text) for text in texts]
+
+    def stats(self):
+        """
+        Return the hit, miss and eviction counters and the current size of each tier.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self.memory),
+                "disk_entries": self._disk_entries if self.cache_dir is not None else 0,
+            }
+
+    def _store_in_memory(self, key, embedding):
+        self.memory[key] = embedding
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.evictions += 1
+
+    def _remove_from_disk(self, file_path):
+        try:
+            os.remove(file_path)
+            self._disk_entries -= 1
+        except FileNotFoundError:
+            pass  # Already removed by another process
+
+    def _evict_from_disk(self):
+        # Remove the least recently used tenth of the entries so eviction does not run on every put
+        file_paths = [os.path.join(self.cache_dir, filename)
+                      for filename in os.listdir(self.cache_dir) if filename.endswith(".npy")]
+        file_paths.sort(key=os.path.getmtime)
+        evict_count = max(len(file_paths) - self.max_disk_entries, self.max_disk_entries // 10)
+        for file_path in file_paths[:evict_count]:
+            os.remove(file_path)
+            self.evictions += 1
+        self._disk_entries = len(file_paths) - len(file_paths[:evict_count])
@@ -0,0 +1,548 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+def normalize_embeddings(embeddings):
+    """
+    Convert embeddings (numpy arrays or torch tensors) to a float32 matrix of unit-length rows,
+    so cosine similarities are plain dot products.
+
+    Parameters:
+    - embeddings (array or tensor): One embedding or a matrix with one embedding per row.
+
+    Returns:
+    - A 2-D float32 numpy array with L2-normalized rows.
+    """
+    if hasattr(embeddings, "cpu"):
+        embeddings = embeddings.detach().cpu().numpy()
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def rank_top_k(similarities, top_k):
+    """
+    Select and rank the top_k columns of each row of a similarity matrix without sorting whole rows.
+
+    Parameters:
+    - similarities (array): A (number of queries, number of targets) similarity matrix.
+    - top_k (int): Number of columns kept per row.
+
+    Returns:
+    - A tuple (indices, scores) of (number of queries, top_k) arrays, best first.
+    """
+    top_k = min(top_k, similarities.shape[1])
+    candidates = np.argpartition(-similarities, top_k - 1, axis=1)[:, :top_k]
+    candidate_scores = np.take_along_axis(similarities, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def save_array(path, array):
+    """
+    Save an array as a .npy file, replacing path atomically. The temporary file is named after the process,
+    so processes writing the same path do not interfere.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(temp_path, path)
+
+
+def read_catalog_sources(modes_directory='modes', poses_directory='poses/json', gestures_directory='gestures/json'):
+    """
+    List the sources of the catalog: one per mode file, plus the pose and gesture directories, whose
+    entries are their file names.
+
+    Returns:
+    - A dictionary mapping each source path to a (kind, modification time in nanoseconds) tuple,
+      where kind is "mode", "pose" or "gesture".
+    """
+    sources = {}
+    for filename in sorted(os.listdir(modes_directory)):
+        if filename.endswith(".json"):
+            file_path = os.path.join(modes_directory, filename)
+            sources[file_path] = ("mode", os.stat(file_path).st_mtime_ns)
+    sources[poses_directory] = ("pose", os.stat(poses_directory).st_mtime_ns)
+    sources[gestures_directory] = ("gesture", os.stat(gestures_directory).st_mtime_ns)
+    return sources
+
+
+def read_catalog_entries(source, kind):
+    """
+    Read the catalog entries of one source.
+
+    Parameters:
+    - source (str): A mode file path, or a pose or gesture directory.
+    - kind (str): "mode", "pose" or "gesture".
+
+    Returns:
+    - A list of metadata dictionaries with the keys kind, mode, pose_index, text and file.
+    """
+    if kind == "mode":
+        with open(source, 'r') as f:
+            data = json.load(f)
+        mode_name = os.path.basename(source)[:-5]
+        # Only the poses that declare a control can be matched by their control text
+        return [{"kind": "control", "mode": mode_name, "pose_index": pose_index, "text": pose['control'],
+                 "file": pose.get('file')}
+                for pose_index, pose in enumerate(data.get('poses', [])) if 'control' in pose]
+
+    return [{"kind": kind, "mode": None, "pose_index": None, "text": filename[:-5].replace("_", " ").lower(),
+             "file": filename}
+            for filename in sorted(os.listdir(source)) if filename.endswith(".json")]
+
+
+EMBEDDING_PRECISIONS = ("float32", "float16", "int8")
+
+
+class CompactEmbeddings:
+    """
+    Unit-length embeddings stored as float32, float16, or int8 with one scale per row.
+
+    Scores are computed block by block on the stored values, so the matrix is never expanded back
+    to float32 as a whole.
+    """
+
+    def __init__(self, values, scales=None):
+        """
+        Initialize the CompactEmbeddings class.
+
+        Parameters:
+        - values (array): A (number of entries, dimension) float32, float16 or int8 matrix.
+        - scales (array): The float32 scale of every row of an int8 matrix, None otherwise.
+        """
+        self.values = values
+        self.scales = scales
+        self.precision = "int8" if scales is not None else np.dtype(values.dtype).name
+
+    @classmethod
+    def from_float(cls, embeddings, precision="float32"):
+        """
+        Normalize float embeddings and store them in the given precision.
+
+        Parameters:
+        - embeddings (array or tensor): One embedding per row.
+        - precision (str): One of EMBEDDING_PRECISIONS.
+
+        Returns:
+        - The CompactEmbeddings.
+        """
+        embeddings = normalize_embeddings(embeddings)
+        if precision == "float32":
+            return cls(embeddings)
+        if precision == "float16":
+            return cls(embeddings.astype(np.float16))
+        if precision == "int8":
+            # Scale every row so its largest component maps to 127
+            scales = np.maximum(np.abs(embeddings).max(axis=1, initial=0.0) / 127, 1e-12).astype(np.float32)
+            return cls(np.round(embeddings / scales[:, np.newaxis]).astype(np.int8), scales)
+        raise ValueError(f"Unknown embedding precision '{precision}', expected one of {EMBEDDING_PRECISIONS}.")
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def dimension(self):
+        return self.values.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def rows(self, indices=None):
+        """
+        Return the given rows, or all rows when indices is None, as a float32 matrix.
+        """
+        values = self.values if indices is None else self.values[indices]
+        rows = np.asarray(values, dtype=np.float32)
+        if self.scales is not None:
+            scales = self.scales if indices is None else self.scales[indices]
+            rows = rows * scales[:, np.newaxis]
+        return rows
+
+    def dot(self, queries, rows=None, block_size=4096):
+        """
+        Compute the dot product of float32 queries with the given rows, or all rows when rows is None.
+
+        Parameters:
+        - queries (array): A (number of queries, dimension) float32 matrix.
+        - rows (array): Indices of the rows to score.
+        - block_size (int): Number of rows converted to float32 at a time.
+
+        Returns:
+        - A (number of queries, number of rows) float32 matrix.
+        """
+        values = self.values if rows is None else self.values[rows]
+        scores = np.empty((len(queries), len(values)), dtype=np.float32)
+        for start in range(0, len(values), block_size):
+            block = np.asarray(values[start:start + block_size], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales if rows is None else self.scales[rows]
+        return scores
+
+
+class ExactSearchIndex:
+    """
+    Exact cosine search: every query is scored against every row with one matrix product.
+    """
+
+    name = "exact"
+
+    def __init__(self, embeddings):
+        """
+        Initialize the ExactSearchIndex class.
+
+        Parameters:
+        - embeddings (CompactEmbeddings): The unit-length embeddings to search.
+        """
+        self.embeddings = embeddings
+
+    def search(self, query_embeddings, top_k=5):
+        """
+        Return a tuple (indices, scores) of (number of queries, top_k) arrays, best first.
+        """
+        similarities = self.embeddings.dot(normalize_embeddings(query_embeddings))
+        return rank_top_k(similarities, top_k)
+
+
+class IVFSearchIndex:
+    """
+    Approximate cosine search with an inverted file: the rows are clustered by spherical k-means and a
+    query is only scored against the rows of the n_probe clusters whose centroids are closest to it.
+    """
+
+    name = "ivf"
+
+    def __init__(self, embeddings, n_lists=None, n_probe=8, iterations=10, seed=0, centroids=None, assignments=None):
+        """
+        Initialize the IVFSearchIndex class, clustering the embeddings unless centroids and assignments are given.
+
+        Parameters:
+        - embeddings (CompactEmbeddings): The unit-length embeddings to search.
+        - n_lists (int): Number of clusters. Defaults to the square root of the number of entries.
+        - n_probe (int): Number of clusters scanned per query; higher is slower and more accurate.
+        - iterations (int): Number of k-means iterations.
+        - seed (int): Seed of the k-means initialization.
+        - centroids (array): Previously fitted (n_lists, dimension) centroids.
+        - assignments (array): Previously fitted cluster of every row.
+        """
+        self.embeddings = embeddings
+        self.n_probe = n_probe
+        if centroids is None or assignments is None:
+            n_lists = n_lists or max(1, int(np.sqrt(len(embeddings))))
+            centroids, assignments = self._fit(embeddings.rows(), n_lists, iterations, seed)
+        self.centroids = centroids
+        self.assignments = assignments
+
+        # Store the inverted lists as one array of row indices grouped by cluster, with cluster offsets
+        self.list_rows = np.argsort(assignments, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))])
+
+    @staticmethod
+    def _fit(embeddings, n_lists, iterations, seed):
+        rng = np.random.default_rng(seed)
+        n_lists = min(n_lists, len(embeddings))
+        centroids = embeddings[rng.choice(len(embeddings), n_lists, replace=False)].copy()
+        assignments = np.zeros(len(embeddings), dtype=np.int64)
+        for _ in range(iterations):
+            assignments = (embeddings @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, embeddings)
+            empty = np.bincount(assignments, minlength=n_lists) == 0
+            # Keep the previous centroid of a cluster that lost all its rows
+            sums[empty] = centroids[empty]
+            centroids = normalize_embeddings(sums)
+        return centroids, (embeddings @ centroids.T).argmax(axis=1)
+
+    def search(self, query_embeddings, top_k=5):
+        """
+        Return a tuple (indices, scores) of (number of queries, top_k) arrays, best first. When the probed
+        clusters hold fewer than top_k rows, the remaining indices are -1 with a score of -inf.
+        """
+        queries = normalize_embeddings(query_embeddings)
+        probed_lists, _ = rank_top_k(queries @ self.centroids.T, self.n_probe)
+
+        indices = np.full((len(queries), top_k), -1, dtype=np.int64)
+        scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        for query_index, lists in enumerate(probed_lists):
+            rows = np.concatenate([self.list_rows[self.list_offsets[cluster]:self.list_offsets[cluster + 1]]
+                                   for cluster in lists])
+            if not len(rows):
+                continue
+            candidate_indices, candidate_scores = rank_top_k(
+                self.embeddings.dot(queries[query_index][np.newaxis], rows=rows), top_k)
+            found = candidate_indices.shape[1]
+            indices[query_index, :found] = rows[candidate_indices[0]]
+            scores[query_index, :found] = candidate_scores[0]
+        return indices, scores
+
+    def save(self, index_dir):
+        """
+        Save the centroids and cluster assignments to index_dir.
+        """
+        save_array(os.path.join(index_dir, "ivf_centroids.npy"), self.centroids)
+        save_array(os.path.join(index_dir, "ivf_assignments.npy"), self.assignments)
+
+    @classmethod
+    def load(cls, index_dir, embeddings, n_probe=8, **fit_options):
+        """
+        Load the clusters saved with save() for the given embeddings, or return None if there are none.
+        The fit options of the constructor are accepted and ignored.
+        """
+        centroids_path = os.path.join(index_dir, "ivf_centroids.npy")
+        assignments_path = os.path.join(index_dir, "ivf_assignments.npy")
+        if not os.path.exists(centroids_path) or not os.path.exists(assignments_path):
+            return None
+        assignments = np.load(assignments_path)
+        if len(assignments) != len(embeddings):
+            return None
+        return cls(embeddings, n_probe=n_probe, centroids=np.load(centroids_path), assignments=assignments)
+
+
+SEARCH_BACKENDS = {ExactSearchIndex.name: ExactSearchIndex, IVFSearchIndex.name: IVFSearchIndex}
+
+
+PROJECTION_METHODS = ("pca", "random")
+
+
+class EmbeddingProjection:
+    """
+    A linear map of unit-length embeddings to fewer dimensions, fitted with PCA on a corpus or drawn as a
+    Gaussian random projection. Projected embeddings are normalized again, so cosine similarity stays a
+    dot product.
+    """
+
+    def __init__(self, components, method, model_id=None):
+        """
+        Initialize the EmbeddingProjection class.
+
+        Parameters:
+        - components (array): A (full dimension, reduced dimension) float32 projection matrix.
+        - method (str): One of PROJECTION_METHODS.
+        - model_id (str): Identity of the model whose embeddings the projection was fitted on.
+        """
+        self.components = np.asarray(components, dtype=np.float32)
+        self.method = method
+        self.model_id = model_id
+
+    @classmethod
+    def fit(cls, embeddings, dimension, method='pca', seed=0, model_id=None):
+        """
+        Fit a projection to the given dimension.
+
+        Parameters:
+        - embeddings (array or tensor): The corpus, one embedding per row.
+        - dimension (int): The reduced dimension.
+        - method (str): 'pca' for the principal axes of the corpus, or 'random' for a random projection.
+        - seed (int): Seed of the random directions.
+        - model_id (str): Identity of the model that produced the embeddings.
+
+        Returns:
+        - The EmbeddingProjection.
+        """
+        embeddings = normalize_embeddings(embeddings)
+        full_dimension = embeddings.shape[1]
+        if not 0 < dimension < full_dimension:
+            raise ValueError(f"The projection dimension must be between 1 and {full_dimension - 1}, got {dimension}.")
+        rng = np.random.default_rng(seed)
+
+        if method == 'random':
+            components = rng.normal(size=(full_dimension, dimension)) / np.sqrt(dimension)
+            return cls(components, method, model_id=model_id)
+        if method != 'pca':
+            raise ValueError(f"Unknown projection method '{method}', expected one of {PROJECTION_METHODS}.")
+
+        # Axes of the uncentered corpus, so dot products with the corpus are kept once the dimension covers it
+        _, singular_values, axes = np.linalg.svd(embeddings, full_matrices=False)
+        axes = axes[singular_values > 1e-6 * singular_values[0]][:dimension]
+        if len(axes) < dimension:
+            # A corpus smaller than the dimension spans fewer axes; complete them with random orthogonal ones
+            random_axes = rng.normal(size=(dimension - len(axes), full_dimension))
+            random_axes -= (random_axes @ axes.T) @ axes
+            axes = np.vstack([axes, np.linalg.qr(random_axes.T)[0].T])
+        return cls(axes.T, method, model_id=model_id)
+
+    @property
+    def dimension(self):
+        return self.components.shape[1]
+
+    @property
+    def identity(self):
+        """
+        A digest of the projection, so indexes built with another projection are not mixed with this one.
+        """
+        return hashlib.sha256(self.method.encode("utf8") + self.components.tobytes()).hexdigest()
+
+    def apply(self, embeddings):
+        """
+        Project embeddings and return them as a float32 matrix of unit-length rows.
+        """
+        return normalize_embeddings(normalize_embeddings(embeddings) @ self.components)
+
+    def save(self, path):
+        """
+        Save the projection to a .npz file, replacing it atomically.
+        """
+        with open(path + ".tmp", 'wb') as f:
+            np.savez(f, components=self.components, method=self.method,
+                     model_id=self.model_id if self.model_id is not None else "")
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a projection saved with save().
+        """
+        with np.load(path) as data:
+            return cls(data["components"], str(data["method"]), model_id=str(data["model_id"]) or None)
+
+
+class CatalogIndex:
+    """
+    An index of every mode control, pose name and gesture name as one contiguous matrix, stored as
+    float32, float16 or int8, with a side table describing each row. Saved indexes are memory-mapped
+    when loaded.
+    """
+
+    def __init__(self, embeddings, metadata, sources, model_id=None, backend=None):
+        """
+        Initialize the CatalogIndex class.
+
+        Parameters:
+        - embeddings (CompactEmbeddings): The unit-length embeddings, one row per entry.
+        - metadata (list of dict): One metadata dictionary per row, as returned by read_catalog_entries.
+        - sources (dict): Mapping of each source to its modification time and its [start, end) row range.
+        - model_id (str): Identity of the model that produced the embeddings.
+        - backend (object): Search backend over the embeddings, such as an IVFSearchIndex. Defaults to exact search.
+        """
+        self.embeddings = embeddings
+        self.metadata = metadata
+        self.sources = sources
+        self.model_id = model_id
+        self.backend = backend if backend is not None else ExactSearchIndex(embeddings)
+
+    @classmethod
+    def build(cls, encode, modes_directory='modes', poses_directory='poses/json', gestures_directory='gestures/json',
+              previous=None, model_id=None, backend='exact', backend_options=None, precision='float32'):
+        """
+        Build the index, reusing the rows of a previous index for every source that did not change.
+
+        Parameters:
+        - encode (callable): Function encoding a list of texts into a matrix of embeddings.
+        - modes_directory (str): Directory of the mode files.
+        - poses_directory (str): Directory of the pose files.
+        - gestures_directory (str): Directory of the gesture files.
+        - previous (CatalogIndex): An earlier index of the same directories, or None to encode everything.
+          It is ignored if it was built with a different model or precision, since its rows would carry the
+          rounding of the other precision.
+        - model_id (str): Identity of the model behind encode.
+        - backend (str): Name of the search backend in SEARCH_BACKENDS.
+        - backend_options (dict): Keyword arguments of the search backend.
+        - precision (str): Storage precision of the embeddings, one of EMBEDDING_PRECISIONS.
+
+        Returns:
+        - The new CatalogIndex.
+        """
+        if previous is not None and (previous.model_id != model_id or previous.embeddings.precision != precision):
+            previous = None
+        catalog_sources = read_catalog_sources(modes_directory, poses_directory, gestures_directory)
+        blocks = []
+        pending = []  # (block index, texts) of the sources that have to be encoded
+        for source, (kind, mtime) in catalog_sources.items():
+            previous_source = previous.sources.get(source) if previous is not None else None
+            if previous_source is not None and previous_source["mtime_ns"] == mtime:
+                start, end = previous_source["rows"]
+                blocks.append((source, mtime, previous.metadata[start:end],
+                               previous.embeddings.rows(np.arange(start, end))))
+            else:
+                entries = read_catalog_entries(source, kind)
+                blocks.append((source, mtime, entries, None))
+                pending.append((len(blocks) - 1, [entry["text"] for entry in entries]))
+
+        # Encode the texts of all changed sources in one batch
+        texts = [text for _, block_texts in pending for text in block_texts]
+        if texts:
+            encoded = normalize_embeddings(encode(texts))
+            offset = 0
+            for block_index, block_texts in pending:
+                source, mtime, entries, _ = blocks[block_index]
+                blocks[block_index] = (source, mtime, entries, encoded[offset:offset + len(block_texts)])
+                offset += len(block_texts)
+
+        dimension = next((block[3].shape[1] for block in blocks if len(block[2])), 0)
+        embeddings = np.zeros((sum(len(block[2]) for block in blocks), dimension), dtype=np.float32)
+        metadata = []
+        sources = {}
+        for source, mtime, entries, block_embeddings in blocks:
+            start = len(metadata)
+            if len(entries):
+                embeddings[start:start + len(entries)] = block_embeddings
+            metadata.extend(entries)
+            sources[source] = {"mtime_ns": mtime, "rows": [start, len(metadata)]}
+        embeddings = CompactEmbeddings.from_float(embeddings, precision)
+        backend = SEARCH_BACKENDS[backend](embeddings, **(backend_options or {}))
+        return cls(embeddings, metadata, sources, model_id=model_id, backend=backend)
+
+    def save(self, index_dir):
+        """
+        Save the embedding matrix as embeddings.npy, with the int8 row scales as embedding_scales.npy,
+        and the side table as metadata.json in index_dir.
+
+        Every file is written to a temporary file and replaced atomically, so indexes already memory-mapped from
+        index_dir stay valid. The backend files, scales and embeddings are replaced before metadata.json, and
+        load checks that the row counts of the files agree.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        if hasattr(self.backend, "save"):
+            self.backend.save(index_dir)
+        if self.embeddings.scales is not None:
+            save_array(os.path.join(index_dir, "embedding_scales.npy"), self.embeddings.scales)
+        save_array(os.path.join(index_dir, "embeddings.npy"), self.embeddings.values)
+        metadata_path = os.path.join(index_dir, "metadata.json")
+        with open(metadata_path + ".tmp", 'w') as f:
+            json.dump({"model_id": self.model_id, "backend": self.backend.name,
+                       "precision": self.embeddings.precision, "metadata": self.metadata, "sources": self.sources}, f)
+        os.replace(metadata_path + ".tmp", metadata_path)
+
+    @classmethod
+    def load(cls, index_dir, mmap=True, backend='exact', backend_options=None):
+        """
+        Load an index saved with save(), memory-mapping the embedding matrix unless mmap is False.
+
+        The search backend saved with the index is reused if it is the requested one; otherwise it is built.
+        """
+        with open(os.path.join(index_dir, "metadata.json"), 'r') as f:
+            data = json.load(f)
+        values = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode='r' if mmap else None)
+        scales = None
+        if data.get("precision") == "int8":
+            scales = np.load(os.path.join(index_dir, "embedding_scales.npy"))
+        if len(values) != len(data["metadata"]) or (scales is not None and len(scales) != len(values)):
+            raise ValueError(f"The index in '{index_dir}' is incomplete; it may be in the middle of a save.")
+        embeddings = CompactEmbeddings(values, scales)
+
+        backend_class = SEARCH_BACKENDS[backend]
+        search_backend = None
+        if data.get("backend") == backend and hasattr(backend_class, "load"):
+            search_backend = backend_class.load(index_dir, embeddings, **(backend_options or {}))
+        if search_backend is None:
+            search_backend = backend_class(embeddings, **(backend_options or {}))
+        return cls(embeddings, data["metadata"], data["sources"], model_id=data.get("model_id"),
+                   backend=search_backend)
+
+    def search(self, query_embeddings, top_k=5):
+        """
+        Score the queries against the index with the search backend.
+
+        Parameters:
+        - query_embeddings (array or tensor): Embeddings of the queries.
+        - top_k (int): Number of rows returned per query.
+
+        Returns:
+        - A tuple (indices, scores) of (number of queries, top_k) arrays, best first.
+        """
+        return self.backend.search(query_embeddings, top_k=top_k)
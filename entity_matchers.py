@@ -1,95 +1,630 @@
 # matchers.py
+import hashlib
 import os
+import time
+import marisa_trie
+import srsly
 from spacy.language import Language
-from spacy.matcher import Matcher
-from spacy.util import filter_spans
+from spacy.matcher import Matcher, PhraseMatcher
+from spacy.util import ensure_path, filter_spans
 from spacy.tokens import Span
 
-def get_patterns_from_directory(directory_path):
+PATTERNS_LOG_PATH = "train_test_data/patterns_output.txt"
+DEFAULT_VOCABULARIES = {"MODE": "modes", "POSE": "poses/json", "GESTURE": "gestures/json"}
+
+
+def entity_name_from_filename(filename):
+    """
+    Strip the .json extension of a file name and replace underscores with spaces to get its entity name.
     """
-    Create spaCy matcher patterns based on filenames in a directory and log the results to a text file.
+    return filename[:-5].replace("_", " ").lower()
+
+
+def entity_pattern(entity_name):
+    """
+    Create a Matcher pattern that matches each word of an entity name.
+    """
+    return [{"LOWER": token} for token in entity_name.split()]
+
+
+def get_patterns_from_directory(directory_path, log_path=None):
+    """
+    Create spaCy matcher patterns based on filenames in a directory and optionally log the results to a text file.
 
     Parameters:
         directory_path (str): Path to the directory containing JSON files.
+        log_path (str): Path of the text file the patterns are logged to. Nothing is written when None.
 
     Returns:
         List of spaCy matcher patterns.
     """
     patterns = []
-    with open("train_test_data/patterns_output.txt", "w") as log_file:  # Output file for patterns
-        for filename in os.listdir(directory_path):
-            if filename.endswith(".json"):
-                # Strip the .json extension and replace underscores with spaces
-                entity_name = filename[:-5].replace("_", " ").lower()
-                # Create a pattern that matches each word
-                pattern = [{"LOWER": token} for token in entity_name.split()]
-                patterns.append(pattern)
-                # Log the pattern to the output file
-                log_file.write(f"Pattern for '{filename}': {pattern}\n")
+    log_lines = []
+    for filename in sorted(os.listdir(directory_path)):
+        if filename.endswith(".json"):
+            pattern = entity_pattern(entity_name_from_filename(filename))
+            patterns.append(pattern)
+            log_lines.append(f"Pattern for '{filename}': {pattern}\n")
+
+    # Log the patterns to the output file only when asked to
+    if log_path:
+        with open(log_path, "w") as log_file:
+            log_file.writelines(log_lines)
 
     return patterns
 
 
-class Matchers:
-    @staticmethod
-    @Language.component("poses_entity_matcher")
-    def poses_entity_matcher(doc):
-        matcher = Matcher(doc.vocab)
-        poses_directory = "poses/json"  # Update with the directory path
-        poses_patterns = get_patterns_from_directory(poses_directory)
-        matcher.add("POSE", poses_patterns)
-        matches = matcher(doc)
-        spans = [doc[start:end] for _, start, end in matches]
-        filtered_spans = filter_spans(spans)
+def resolve_span_conflicts(labelled_spans, label_priority):
+    """
+    Select non-overlapping spans from matches of several labels in one pass.
+
+    Longer spans win over shorter ones; spans of the same length are decided by label priority, then position.
 
-        # Collect existing entities that do not overlap with matcher spans
-        existing_ents = [ent for ent in doc.ents if not any(
-            ent.start <= span.start < ent.end or ent.start < span.end <= ent.end for span in filtered_spans)]
+    Parameters:
+        labelled_spans (list of tuples): (start, end, label) token offsets of the matched spans.
+        label_priority (list of str): Labels ordered from highest to lowest priority.
 
-        # Add matcher-found spans as new entities
-        new_ents = [Span(doc, span.start, span.end, label="POSE") for span in filtered_spans]
+    Returns:
+        The kept (start, end, label) tuples sorted by start.
+    """
+    rank = {label: index for index, label in enumerate(label_priority)}
+    ordered = sorted(labelled_spans, key=lambda span: (span[0] - span[1], rank.get(span[2], len(rank)), span[0]))
+    kept = []
+    seen_tokens = set()
+    for start, end, label in ordered:
+        if not seen_tokens.intersection(range(start, end)):
+            kept.append((start, end, label))
+            seen_tokens.update(range(start, end))
+    return sorted(kept)
 
-        # Combine and update Doc.ents
-        doc.ents = existing_ents + new_ents
 
-        return doc
-    @staticmethod
-    @Language.component("gesture_entity_matcher")
-    def poses_entity_matcher(doc):
-        matcher = Matcher(doc.vocab)
-        gestures_directory = "gestures/json"  # Update with the directory path
-        gesture_patterns = get_patterns_from_directory(gestures_directory)
-        matcher.add("GESTURE", gesture_patterns)
-        matches = matcher(doc)
-        spans = [doc[start:end] for _, start, end in matches]
-        filtered_spans = filter_spans(spans)
+def merge_matched_entities(existing_ents, matched_spans):
+    """
+    Merge the existing entities of a Doc with rule-based matcher spans in O(n log n).
 
-        # Collect existing entities that do not overlap with matcher spans
-        existing_ents = [ent for ent in doc.ents if not any(
-            ent.start <= span.start < ent.end or ent.start < span.end <= ent.end for span in filtered_spans)]
+    Matcher spans take precedence: existing entities overlapping any of them are dropped. Both inputs
+    are sorted once and swept together, instead of checking every entity against every span.
 
-        # Add matcher-found spans as new entities
-        new_ents = [Span(doc, span.start, span.end, label="GESTURE") for span in filtered_spans]
+    Parameters:
+        existing_ents (iterable of Span): The current entities of the Doc, non-overlapping.
+        matched_spans (iterable of Span): Labelled matcher spans, non-overlapping.
 
-        # Combine and update Doc.ents
-        doc.ents = existing_ents + new_ents
+    Returns:
+        List of entity spans sorted by start, ready to be assigned to doc.ents.
+    """
+    existing_ents = sorted(existing_ents, key=lambda ent: ent.start)
+    matched_spans = sorted(matched_spans, key=lambda span: span.start)
+    merged = list(matched_spans)
+    span_index = 0
+    for ent in existing_ents:
+        # Skip the matcher spans that end before this entity starts; their ends are sorted too
+        while span_index < len(matched_spans) and matched_spans[span_index].end <= ent.start:
+            span_index += 1
+        if span_index == len(matched_spans) or matched_spans[span_index].start >= ent.end:
+            merged.append(ent)
+    return sorted(merged, key=lambda span: span.start)
 
-        return doc
+
+def apply_vocabulary_spans(doc, labelled_spans, merge_labels=(), fallback_labels=()):
+    """
+    Apply the non-overlapping spans of a multi-label matcher to a Doc.
+
+    Spans of merge_labels are merged into single tokens and left to the NER, as the modes matcher does.
+    Spans of fallback_labels only become entities where no existing entity overlaps them. All other
+    spans replace the existing entities they overlap.
+
+    Parameters:
+        doc (Doc): The Doc to update.
+        labelled_spans (list of tuples): (start, end, label) token offsets, non-overlapping.
+        merge_labels (collection of str): Labels whose spans are merged into single tokens.
+        fallback_labels (collection of str): Labels that rank below the existing entities.
+
+    Returns:
+        The Doc.
+    """
+    entity_spans = [Span(doc, start, end, label=label) for start, end, label in labelled_spans
+                    if label not in merge_labels and label not in fallback_labels]
+    doc.ents = merge_matched_entities(doc.ents, entity_spans)
+
+    fallback_spans = [(start, end, label) for start, end, label in labelled_spans if label in fallback_labels]
+    if fallback_spans:
+        taken = set()
+        for ent in doc.ents:
+            taken.update(range(ent.start, ent.end))
+        doc.ents = list(doc.ents) + [Span(doc, start, end, label=label) for start, end, label in fallback_spans
+                                     if not taken.intersection(range(start, end))]
+
+    merge_spans = [doc[start:end] for start, end, label in labelled_spans if label in merge_labels]
+    if merge_spans:
+        with doc.retokenize() as retokenizer:
+            for span in merge_spans:
+                retokenizer.merge(span)
+    return doc
+
+
+def vocabulary_hash(entity_names):
+    """
+    Compute a content hash of vocabulary tables. Patterns only depend on the file names, so the hash
+    covers the label and the sorted JSON file names of every vocabulary.
+
+    Parameters:
+        entity_names (dict): Mapping of entity label to an iterable of JSON file names.
+
+    Returns:
+        Hex digest of the vocabularies.
+    """
+    digest = hashlib.sha256()
+    for label in sorted(entity_names):
+        digest.update(label.encode("utf8") + b"\0")
+        for filename in sorted(entity_names[label]):
+            digest.update(filename.encode("utf8") + b"\0")
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+
+class VocabularyRegistry:
+    """
+    Keeps the entity names of vocabulary directories up to date while the system is running.
+
+    The directories are polled by modification time at most once per poll interval; only a directory
+    whose modification time changed is listed again, and subscribers are told which files were added
+    or removed so they can update their compiled patterns incrementally.
+    """
+
+    def __init__(self, vocabularies, poll_interval=2.0):
+        """
+        Initialize the VocabularyRegistry class. The directories are not read until scan() is called.
+
+        Parameters:
+        - vocabularies (dict): Mapping of entity label to the directory whose JSON file names are entities.
+        - poll_interval (float): Minimum number of seconds between two polls. None disables polling.
+        """
+        self.vocabularies = dict(vocabularies)
+        self.poll_interval = poll_interval
+        self.entity_names = {label: {} for label in self.vocabularies}  # label -> {filename: entity name}
+        self.loaded = False
+        self._directory_mtimes = {}
+        self._listeners = []
+        self._last_poll = time.monotonic()
+
+    def subscribe(self, listener):
+        """
+        Register a callback called as listener(label, added, removed) whenever a vocabulary changes,
+        where added and removed map file names to entity names.
+        """
+        self._listeners.append(listener)
+
+    def scan(self):
+        """
+        List every directory and update the vocabularies from the files found.
+        """
+        for label in self.vocabularies:
+            self._notify(label, *self._rescan(label))
+        self.loaded = True
+        self._last_poll = time.monotonic()
+
+    def load(self, entity_names):
+        """
+        Replace the vocabularies with previously saved tables without reading the directories.
+
+        The modification times of the directories are recorded now, so until a directory is modified after
+        the load its loaded table is kept by poll(), including when the directory is missing.
+
+        Parameters:
+        - entity_names (dict): Mapping of entity label to {filename: entity name}.
+        """
+        for label in self.vocabularies:
+            current = self.entity_names[label]
+            updated = dict(entity_names.get(label, {}))
+            self.entity_names[label] = updated
+            self._directory_mtimes[label] = self._directory_mtime(self.vocabularies[label])
+            self._notify(label, {filename: name for filename, name in updated.items() if filename not in current},
+                         {filename: name for filename, name in current.items() if filename not in updated})
+        self.loaded = True
+
+    def source_hash(self):
+        """
+        Compute the vocabulary_hash of the directories as they are now and remember their modification times.
+
+        Returns:
+        - Hex digest of the directories, or None if any of them is missing.
+        """
+        filenames = {}
+        for label, directory in self.vocabularies.items():
+            mtime = self._directory_mtime(directory)
+            if mtime is None:
+                return None
+            filenames[label] = [filename for filename in os.listdir(directory) if filename.endswith(".json")]
+            self._directory_mtimes[label] = mtime
+        return vocabulary_hash(filenames)
+
+    def poll(self, force=False):
+        """
+        Check the directories for added or removed files if the poll interval has elapsed.
+
+        Parameters:
+        - force (bool): Check the directories even if the poll interval has not elapsed.
+
+        Returns:
+        - True if any vocabulary changed, False otherwise.
+        """
+        now = time.monotonic()
+        if not force and (self.poll_interval is None or now - self._last_poll < self.poll_interval):
+            return False
+        self._last_poll = now
+
+        changed = False
+        for label, directory in self.vocabularies.items():
+            if self._directory_mtime(directory) == self._directory_mtimes.get(label):
+                continue
+            added, removed = self._rescan(label)
+            changed = self._notify(label, added, removed) or changed
+        return changed
+
+    def _notify(self, label, added, removed):
+        if not added and not removed:
+            return False
+        for listener in self._listeners:
+            listener(label, added, removed)
+        return True
 
     @staticmethod
-    @Language.component("modes_entity_matcher")
-    def modes_entity_matcher(doc):
-        matcher = Matcher(doc.vocab)
-        modes_directory = "modes"  # Update with the directory path
-        modes_patterns = get_patterns_from_directory(modes_directory)
-        matcher.add("MODE", modes_patterns)
-        matches = matcher(doc)
+    def _directory_mtime(directory):
+        try:
+            return os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _rescan(self, label):
+        directory = self.vocabularies[label]
+        # Read the modification time before listing so a change made during the listing is seen next poll
+        self._directory_mtimes[label] = self._directory_mtime(directory)
+        if self._directory_mtimes[label] is None:
+            filenames = []
+        else:
+            filenames = sorted(filename for filename in os.listdir(directory) if filename.endswith(".json"))
+
+        current = self.entity_names[label]
+        updated = {filename: current.get(filename) or entity_name_from_filename(filename)
+                   for filename in filenames}
+        added = {filename: name for filename, name in updated.items() if filename not in current}
+        removed = {filename: name for filename, name in current.items() if filename not in updated}
+        self.entity_names[label] = updated
+        return added, removed
+
+
+class VocabularyComponent:
+    """
+    Base class of the entity matcher components: loads the vocabularies on first use, keeps them
+    in step with their directories and serializes the pattern tables with the pipeline.
+
+    Subclasses implement _update_patterns(label, added, removed) and _pattern_log_lines().
+    """
+
+    def _init_vocabularies(self, vocabularies, poll_interval, log_patterns, refresh_on_load):
+        self.log_patterns = log_patterns
+        self.refresh_on_load = refresh_on_load
+        self.refreshed_on_load = False
+        self.registry = VocabularyRegistry(vocabularies, poll_interval=poll_interval)
+        self.registry.subscribe(self._update_patterns)
+
+    def _ensure_vocabularies(self):
+        """
+        Build the patterns from the directories, unless they were already built or loaded from disk.
+        """
+        if self.registry.loaded:
+            return
+        self.registry.scan()
+        if self.log_patterns:
+            with open(PATTERNS_LOG_PATH, "w") as log_file:
+                log_file.writelines(self._pattern_log_lines())
+
+    def _serialize_vocabularies(self):
+        self._ensure_vocabularies()
+        return {"entity_names": self.registry.entity_names,
+                "source_hash": vocabulary_hash(self.registry.entity_names)}
+
+    def _deserialize_vocabularies(self, data):
+        self.registry.load(data["entity_names"])
+        if self.refresh_on_load:
+            source_hash = self.registry.source_hash()
+            # Only read the directories again if they are available and differ from the saved tables
+            if source_hash is not None and source_hash != data["source_hash"]:
+                self.registry.scan()
+                self.refreshed_on_load = True
+
+    def to_bytes(self, *, exclude=tuple()):
+        return srsly.msgpack_dumps(self._serialize_vocabularies())
+
+    def from_bytes(self, bytes_data, *, exclude=tuple()):
+        self._deserialize_vocabularies(srsly.msgpack_loads(bytes_data))
+        return self
+
+    def to_disk(self, path, *, exclude=tuple()):
+        path = ensure_path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        srsly.write_json(path / "patterns.json", self._serialize_vocabularies())
+
+    def from_disk(self, path, *, exclude=tuple()):
+        patterns_path = ensure_path(path) / "patterns.json"
+        # Pipelines saved before the tables were serialized build them from the directories on first use
+        if patterns_path.exists():
+            self._deserialize_vocabularies(srsly.read_json(patterns_path))
+        return self
+
+
+class EntityMatcher(VocabularyComponent):
+    """
+    A pipeline component that labels the file names of a directory as entities.
+
+    The patterns are compiled into a Matcher once per pipeline, either from the directory on first use or
+    from the tables saved with the pipeline, and then kept in step with the directory by a VocabularyRegistry,
+    so processing a Doc does not depend on the directory size.
+    """
+
+    def __init__(self, nlp, name, label, directory, log_patterns=False, merge_spans=False, poll_interval=2.0,
+                 refresh_on_load=True):
+        """
+        Initialize the EntityMatcher component.
+
+        Parameters:
+        - nlp (Language): The pipeline the component is added to.
+        - name (str): The component name.
+        - label (str): The entity label assigned to matched spans.
+        - directory (str): Path to the directory whose JSON file names are matched.
+        - log_patterns (bool): Whether to write the compiled patterns to PATTERNS_LOG_PATH.
+        - merge_spans (bool): Merge matched spans into single tokens instead of setting doc.ents.
+        - poll_interval (float): Seconds between checks of the directory for new or removed files. None disables them.
+        - refresh_on_load (bool): When loading saved patterns, rebuild them if the directory hash differs.
+        """
+        self.name = name
+        self.label = label
+        self.directory = directory
+        self.merge_spans = merge_spans
+        self.matcher = Matcher(nlp.vocab)
+        self._init_vocabularies({label: directory}, poll_interval, log_patterns, refresh_on_load)
+
+    def _update_patterns(self, label, added, removed):
+        for filename in removed:
+            self.matcher.remove(f"{label}:{filename}")
+        for filename, entity_name in added.items():
+            self.matcher.add(f"{label}:{filename}", [entity_pattern(entity_name)])
+
+    def _pattern_log_lines(self):
+        return [f"Pattern for '{filename}': {entity_pattern(entity_name)}\n"
+                for filename, entity_name in sorted(self.registry.entity_names[self.label].items())]
+
+    def __call__(self, doc):
+        self._ensure_vocabularies()
+        self.registry.poll()
+        matches = self.matcher(doc) if len(self.matcher) else []
         spans = [doc[start:end] for _, start, end in matches]
         filtered_spans = filter_spans(spans)
 
-        with doc.retokenize() as retokenizer:
-            for span in filtered_spans:
-                retokenizer.merge(span)
-                span.label_ = "MODE"  # Overwrites any existing entity label
+        if self.merge_spans:
+            with doc.retokenize() as retokenizer:
+                for span in filtered_spans:
+                    retokenizer.merge(span)
+                    span.label_ = self.label  # Overwrites any existing entity label
+            return doc
+
+        # Add matcher-found spans as new entities, replacing the existing entities they overlap
+        new_ents = [Span(doc, span.start, span.end, label=self.label) for span in filtered_spans]
+        doc.ents = merge_matched_entities(doc.ents, new_ents)
 
         return doc
+
+
+class VocabularyEntityMatcher(VocabularyComponent):
+    """
+    A pipeline component that labels the file names of several directories as entities in a single pass.
+
+    Every vocabulary is added to one PhraseMatcher, so the Doc is matched once and the conflicts between
+    labels are resolved once, whatever the number of vocabularies. A VocabularyRegistry keeps the
+    PhraseMatcher in step with the directories.
+    """
+
+    def __init__(self, nlp, name, vocabularies, label_priority=None, log_patterns=False, poll_interval=2.0,
+                 refresh_on_load=True, merge_labels=(), fallback_labels=()):
+        """
+        Initialize the VocabularyEntityMatcher component.
+
+        Parameters:
+        - nlp (Language): The pipeline the component is added to.
+        - name (str): The component name.
+        - vocabularies (dict): Mapping of entity label to the directory whose JSON file names are matched.
+        - label_priority (list of str): Labels ordered from highest to lowest priority for overlapping matches
+          of the same length. Defaults to the order of the vocabularies.
+        - log_patterns (bool): Whether to write the compiled patterns to PATTERNS_LOG_PATH.
+        - poll_interval (float): Seconds between checks of the directories for new or removed files. None disables them.
+        - refresh_on_load (bool): When loading saved patterns, rebuild them if the directories' hash differs.
+        - merge_labels (list of str): Labels whose matches are merged into single tokens instead of becoming entities.
+        - fallback_labels (list of str): Labels whose matches only become entities where no existing entity overlaps.
+        """
+        self.name = name
+        self.nlp = nlp
+        self.vocabularies = dict(vocabularies)
+        self.label_priority = list(label_priority or self.vocabularies)
+        self.merge_labels = set(merge_labels)
+        self.fallback_labels = set(fallback_labels)
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        self._key_labels = {}  # match key hash -> entity label
+        self._init_vocabularies(self.vocabularies, poll_interval, log_patterns, refresh_on_load)
+
+    def _update_patterns(self, label, added, removed):
+        for filename in removed:
+            key = f"{label}:{filename}"
+            self.matcher.remove(key)
+            del self._key_labels[self.nlp.vocab.strings[key]]
+        for filename, entity_name in added.items():
+            key = f"{label}:{filename}"
+            self.matcher.add(key, [self.nlp.make_doc(entity_name)])
+            self._key_labels[self.nlp.vocab.strings.add(key)] = label
+
+    def _pattern_log_lines(self):
+        return [f"Pattern for '{entity_name}': {label}\n"
+                for label, entity_names in self.registry.entity_names.items()
+                for entity_name in sorted(entity_names.values())]
+
+    def __call__(self, doc):
+        self._ensure_vocabularies()
+        self.registry.poll()
+        matches = [(start, end, self._key_labels[match_id]) for match_id, start, end in self.matcher(doc)]
+        kept_spans = resolve_span_conflicts(matches, self.label_priority)
+        return apply_vocabulary_spans(doc, kept_spans, self.merge_labels, self.fallback_labels)
+
+
+class TrieEntityMatcher(VocabularyComponent):
+    """
+    A pipeline component that labels the longest entity names found in a Doc, using a marisa-trie.
+
+    The lowercased tokens are walked once and each candidate name is looked up in the trie, so the
+    cost of a Doc depends on its length and not on the number of entity names. The trie is built
+    once from the vocabularies, saved with the pipeline and memory-mapped when it is loaded.
+    """
+
+    def __init__(self, nlp, name, vocabularies, label_priority=None, log_patterns=False, poll_interval=2.0,
+                 refresh_on_load=True, merge_labels=(), fallback_labels=()):
+        """
+        Initialize the TrieEntityMatcher component.
+
+        Parameters:
+        - nlp (Language): The pipeline the component is added to.
+        - name (str): The component name.
+        - vocabularies (dict): Mapping of entity label to the directory whose JSON file names are matched.
+        - label_priority (list of str): Labels ordered from highest to lowest priority for entity names
+          found in several vocabularies. Defaults to the order of the vocabularies.
+        - log_patterns (bool): Whether to write the entity names to PATTERNS_LOG_PATH.
+        - poll_interval (float): Seconds between checks of the directories for new or removed files. None disables them.
+        - refresh_on_load (bool): When loading saved patterns, rebuild them if the directories' hash differs.
+        - merge_labels (list of str): Labels whose matches are merged into single tokens instead of becoming entities.
+        - fallback_labels (list of str): Labels whose matches only become entities where no existing entity overlaps.
+        """
+        self.name = name
+        self.nlp = nlp
+        self.vocabularies = dict(vocabularies)
+        self.label_priority = list(label_priority or self.vocabularies)
+        self.merge_labels = set(merge_labels)
+        self.fallback_labels = set(fallback_labels)
+        self.trie = None
+        self._init_vocabularies(self.vocabularies, poll_interval, log_patterns, refresh_on_load)
+
+    def _update_patterns(self, label, added, removed):
+        # A trie cannot be changed in place, it is rebuilt on the next Doc
+        self.trie = None
+
+    def _pattern_log_lines(self):
+        return [f"Pattern for '{entity_name}': {label}\n"
+                for label, entity_names in self.registry.entity_names.items()
+                for entity_name in sorted(entity_names.values())]
+
+    def _build_trie(self):
+        """
+        Build a trie mapping each entity name, as space-joined lowercased tokens, to its label.
+        """
+        rank = {label: index for index, label in enumerate(self.label_priority)}
+        labels = {}
+        for label, entity_names in self.registry.entity_names.items():
+            for entity_name in entity_names.values():
+                key = " ".join(token.lower_ for token in self.nlp.make_doc(entity_name))
+                if key not in labels or rank.get(label, len(rank)) < rank.get(labels[key], len(rank)):
+                    labels[key] = label
+        return marisa_trie.BytesTrie((key, label.encode("utf8")) for key, label in labels.items())
+
+    def to_disk(self, path, *, exclude=tuple()):
+        super().to_disk(path, exclude=exclude)
+        if self.trie is None:
+            self.trie = self._build_trie()
+        self.trie.save(str(ensure_path(path) / "entities.marisa"))
+
+    def from_disk(self, path, *, exclude=tuple()):
+        super().from_disk(path, exclude=exclude)
+        trie_path = ensure_path(path) / "entities.marisa"
+        # The saved trie is only valid if the tables were not refreshed from changed directories
+        if trie_path.exists() and (ensure_path(path) / "patterns.json").exists() and not self.refreshed_on_load:
+            self.trie = marisa_trie.BytesTrie()
+            self.trie.mmap(str(trie_path))
+        return self
+
+    def __call__(self, doc):
+        self._ensure_vocabularies()
+        self.registry.poll()
+        if self.trie is None:
+            self.trie = self._build_trie()
+
+        lowers = [token.lower_ for token in doc]
+        new_ents = []
+        start = 0
+        while start < len(lowers):
+            # Extend the candidate one token at a time while some entity name continues with it
+            key = lowers[start]
+            end = start + 1
+            match_key, match_end = None, None
+            while True:
+                if key in self.trie:
+                    match_key, match_end = key, end
+                if end == len(lowers) or next(self.trie.iterkeys(key + " "), None) is None:
+                    break
+                key = f"{key} {lowers[end]}"
+                end += 1
+
+            if match_key is None:
+                start += 1
+            else:
+                new_ents.append((start, match_end, self.trie[match_key][0].decode("utf8")))
+                start = match_end
+
+        return apply_vocabulary_spans(doc, new_ents, self.merge_labels, self.fallback_labels)
+
+
+class Matchers:
+    @staticmethod
+    @Language.factory("poses_entity_matcher", default_config={"directory": "poses/json", "log_patterns": False,
+                                                              "poll_interval": 2.0, "refresh_on_load": True})
+    def poses_entity_matcher(nlp, name, directory, log_patterns, poll_interval, refresh_on_load):
+        return EntityMatcher(nlp, name, "POSE", directory, log_patterns=log_patterns, poll_interval=poll_interval,
+                             refresh_on_load=refresh_on_load)
+
+    @staticmethod
+    @Language.factory("gesture_entity_matcher", default_config={"directory": "gestures/json", "log_patterns": False,
+                                                                "poll_interval": 2.0, "refresh_on_load": True})
+    def gesture_entity_matcher(nlp, name, directory, log_patterns, poll_interval, refresh_on_load):
+        return EntityMatcher(nlp, name, "GESTURE", directory, log_patterns=log_patterns, poll_interval=poll_interval,
+                             refresh_on_load=refresh_on_load)
+
+    @staticmethod
+    @Language.factory("modes_entity_matcher", default_config={"directory": "modes", "log_patterns": False,
+                                                              "poll_interval": 2.0, "refresh_on_load": True})
+    def modes_entity_matcher(nlp, name, directory, log_patterns, poll_interval, refresh_on_load):
+        return EntityMatcher(nlp, name, "MODE", directory, log_patterns=log_patterns, merge_spans=True,
+                             poll_interval=poll_interval, refresh_on_load=refresh_on_load)
+
+    @staticmethod
+    @Language.factory("vocabulary_entity_matcher", default_config={"vocabularies": None,
+                                                                   "label_priority": None,
+                                                                   "log_patterns": False,
+                                                                   "poll_interval": 2.0,
+                                                                   "refresh_on_load": True,
+                                                                   "merge_labels": ["MODE"],
+                                                                   "fallback_labels": ["GESTURE"]})
+    def vocabulary_entity_matcher(nlp, name, vocabularies, label_priority, log_patterns, poll_interval,
+                                  refresh_on_load, merge_labels, fallback_labels):
+        # Dict defaults would be merged into custom vocabularies by the config system, so None stands for them
+        return VocabularyEntityMatcher(nlp, name, vocabularies or DEFAULT_VOCABULARIES, label_priority=label_priority,
+                                       log_patterns=log_patterns, poll_interval=poll_interval,
+                                       refresh_on_load=refresh_on_load, merge_labels=merge_labels,
+                                       fallback_labels=fallback_labels)
+
+    @staticmethod
+    @Language.factory("trie_entity_matcher", default_config={"vocabularies": None,
+                                                             "label_priority": None,
+                                                             "log_patterns": False,
+                                                             "poll_interval": 2.0,
+                                                             "refresh_on_load": True,
+                                                             "merge_labels": ["MODE"],
+                                                             "fallback_labels": ["GESTURE"]})
+    def trie_entity_matcher(nlp, name, vocabularies, label_priority, log_patterns, poll_interval, refresh_on_load,
+                            merge_labels, fallback_labels):
+        return TrieEntityMatcher(nlp, name, vocabularies or DEFAULT_VOCABULARIES, label_priority=label_priority, log_patterns=log_patterns,
+                                 poll_interval=poll_interval, refresh_on_load=refresh_on_load,
+                                 merge_labels=merge_labels, fallback_labels=fallback_labels)
@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import hashlib
+
+RESOLVER_MAP_VERSION = 1
+DEFAULT_ENTITY_DIRECTORIES = {"POSE": "poses/json", "GESTURE": "gestures/json"}
+
+
+def normalize_entity_text(text):
+    """
+    Normalize entity text or a file name for lookups: lowercase, underscores and punctuation as spaces,
+    and single spaces between words.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower().replace("_", " ")).split())
+
+
+class EntityResolver:
+    """
+    Resolve NER entity text such as "index pinch" or "fist" to pose and gesture JSON files.
+
+    Results are kept in a versioned map persisted as JSON, which is discarded when the model or the set of
+    files changes. Entity text naming a file is resolved directly, known text is looked up by its exact or
+    normalized form, and only the remaining misses are searched with the transformer embeddings.
+    """
+
+    def __init__(self, matcher, directories=None, map_path='entity_file_map.json'):
+        """
+        Initialize the EntityResolver class.
+
+        Parameters:
+        - matcher (NamedEntityMatcher): The matcher whose model, embedding caches and similarity threshold are used.
+        - directories (dict): Mapping of entity label to the directory of its JSON files. Defaults to
+          DEFAULT_ENTITY_DIRECTORIES.
+        - map_path (str): Path of the persisted map. None keeps the map in memory only.
+        """
+        self.matcher = matcher
+        self.directories = dict(directories or DEFAULT_ENTITY_DIRECTORIES)
+        self.map_path = map_path
+        self.hits = 0
+        self.misses = 0
+        self._directory_mtimes = None
+        self._scan()
+        self._load()
+
+    def resolve(self, text, label=None):
+        """
+        Resolve one entity text.
+
+        Parameters:
+        - text (str): The entity text.
+        - label (str): Restrict the search to the files of this label, e.g. "POSE". None searches every label.
+
+        Returns:
+        - A dictionary with the label, file, best_match name and cosine_similarity of the matched file, or None
+          if no file reaches the similarity threshold.
+        """
+        return self.resolve_many([text], [label])[0]
+
+    def resolve_many(self, texts, labels=None):
+        """
+        Resolve a corpus of entity texts in one batched pass: every miss is encoded in a single batch and
+        searched with one matrix product per label.
+
+        Parameters:
+        - texts (list of str): The entity texts.
+        - labels (list of str): The label of each text, or None to search every label for all of them.
+
+        Returns:
+        - One result per text, as returned by resolve.
+        """
+        self._refresh()
+        labels = list(labels) if labels is not None else [None] * len(texts)
+        results = [None] * len(texts)
+        missing = {}  # (scope, normalized text) -> positions in texts
+        for position, (text, label) in enumerate(zip(texts, labels)):
+            scope = self._scope(label)
+            entries = self.entries.setdefault(scope, {})
+            if text in entries:
+                results[position] = entries[text]
+                self.hits += 1
+                continue
+            normalized = normalize_entity_text(text)
+            if normalized in entries:
+                results[position] = entries[normalized]
+                self.hits += 1
+                continue
+            self.misses += 1
+            missing.setdefault((scope, normalized), []).append(position)
+
+        if missing:
+            self._search(missing, results)
+            self.save()
+        return results
+
+    def stats(self):
+        """
+        Return the lookup hit and miss counters and the number of entries in the map.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": sum(len(entries) for entries in self.entries.values()),
+        }
+
+    def save(self):
+        """
+        Write the map to map_path, replacing it atomically.
+        """
+        if self.map_path is None:
+            return
+        with open(self.map_path + ".tmp", 'w') as f:
+            json.dump({"version": RESOLVER_MAP_VERSION, "model_id": self.matcher.model_id,
+                       "files_hash": self.files_hash, "similarity_threshold": self.matcher.similarity_threshold,
+                       "entries": self.entries}, f)
+        os.replace(self.map_path + ".tmp", self.map_path)
+
+    def _scope(self, label):
+        if label is not None and label not in self.directories:
+            raise ValueError(f"Unknown entity label '{label}', expected one of {sorted(self.directories)}.")
+        return label if label is not None else "*"
+
+    def _scan(self):
+        """
+        List the files of every directory and compute the hash of the file set.
+        """
+        self._directory_mtimes = {label: os.stat(directory).st_mtime_ns for label, directory in self.directories.items()}
+        self.files = {label: sorted(filename for filename in os.listdir(directory) if filename.endswith(".json"))
+                      for label, directory in self.directories.items()}
+        digest = hashlib.sha256()
+        for label in sorted(self.files):
+            digest.update(label.encode("utf8") + b"\0" + "\0".join(self.files[label]).encode("utf8") + b"\1")
+        self.files_hash = digest.hexdigest()
+
+    def _load(self):
+        """
+        Load the persisted map if it was built for the same version, model, threshold and file set.
+        """
+        self.entries = {}
+        if self.map_path is not None and os.path.exists(self.map_path):
+            with open(self.map_path, 'r') as f:
+                data = json.load(f)
+            if (data.get("version") == RESOLVER_MAP_VERSION and data.get("model_id") == self.matcher.model_id
+                    and data.get("files_hash") == self.files_hash
+                    and data.get("similarity_threshold") == self.matcher.similarity_threshold):
+                self.entries = data["entries"]
+        self._seed_file_names()
+
+    def _seed_file_names(self):
+        # Entity text naming a file resolves to it without the transformer
+        for label, filenames in self.files.items():
+            for filename in filenames:
+                name = normalize_entity_text(filename[:-5])
+                result = {"label": label, "file": filename, "best_match": name, "cosine_similarity": 1.0}
+                self.entries.setdefault(label, {}).setdefault(name, result)
+                self.entries.setdefault("*", {}).setdefault(name, result)
+
+    def _refresh(self):
+        """
+        Discard the map if a directory changed its set of files. The model is checked when the map is loaded.
+        """
+        directory_mtimes = {label: os.stat(directory).st_mtime_ns for label, directory in self.directories.items()}
+        if directory_mtimes == self._directory_mtimes:
+            return
+        files_hash = self.files_hash
+        self._scan()
+        if self.files_hash != files_hash:
+            self.entries = {}
+            self._seed_file_names()
+
+    def _search(self, missing, results):
+        """
+        Encode the missing texts in one batch and search the file names of their scope.
+        """
+        keys = list(missing)
+        embeddings = self.matcher.encode_queries([normalized for _, normalized in keys])
+        for scope in dict.fromkeys(scope for scope, _ in keys):
+            rows = [row for row, (key_scope, _) in enumerate(keys) if key_scope == scope]
+            labels = list(self.files) if scope == "*" else [scope]
+            candidates = [(label, filename) for label in labels for filename in self.files[label]]
+            if not candidates:
+                matches = {}
+            else:
+                names = [normalize_entity_text(filename[:-5]) for _, filename in candidates]
+                matches = self.matcher.find_best_match(embeddings[rows], self.matcher.encode_controls(names))
+            for match_row, row in enumerate(rows):
+                result = None
+                if match_row in matches:
+                    candidate_idx, score = matches[match_row]
+                    label, filename = candidates[candidate_idx]
+                    result = {"label": label, "file": filename, "best_match": normalize_entity_text(filename[:-5]),
+                              "cosine_similarity": score}
+                # Texts below the threshold are stored too, so they are not searched again
+                self.entries[scope][keys[row][1]] = result
+                for position in missing[keys[row]]:
+                    results[position] = result
@@ -0,0 +1,143 @@
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+class MicroBatchDispatcher:
+    """
+    Collect concurrent asyncio requests for a few milliseconds, or until enough phrases are waiting, and
+    process them as one batch on a worker thread, fanning the results back out to the callers.
+    """
+
+    def __init__(self, process_batch, max_wait_ms=5.0, max_batch_size=64, latency_window=10000):
+        """
+        Initialize the MicroBatchDispatcher class.
+
+        Parameters:
+        - process_batch (callable): Takes a list of requests and returns one result per request, in order. A
+          result that is an exception is raised to the caller of that request only.
+        - max_wait_ms (float): How long the first request of a batch waits for others to join it.
+        - max_batch_size (int): Number of phrases that dispatches a batch without waiting any longer.
+        - latency_window (int): Number of recent request latencies kept for the stats.
+        """
+        self.process_batch = process_batch
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_size = max_batch_size
+        self.loop = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="MicroBatchDispatcher")
+        self._pending = []
+        self._pending_size = 0
+        self._flush_handle = None
+        self._in_flight = 0
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_phrases = 0
+        self.busy_seconds = 0.0
+        self._latencies = deque(maxlen=latency_window)
+        self._first_submitted = None
+        self._last_completed = None
+
+    async def submit(self, request, size=1):
+        """
+        Queue a request for the next batch and wait for its result.
+
+        Parameters:
+        - request: The request passed on to process_batch.
+        - size (int): Number of phrases in the request, counted against max_batch_size.
+
+        Returns:
+        - The result of the request.
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self._bind(loop)
+
+        submitted = time.perf_counter()
+        if self._first_submitted is None:
+            self._first_submitted = submitted
+        future = loop.create_future()
+        self._pending.append((request, future, submitted))
+        self._pending_size += size
+        self.requests += 1
+
+        if self._pending_size >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _bind(self, loop):
+        """
+        Move the dispatcher to another event loop, e.g. for the next asyncio.run call. Requests still pending
+        on a closed loop can never complete, so they are dropped. An open loop keeps the dispatcher until its
+        work is done.
+        """
+        if self.loop is not None and not self.loop.is_closed() and (self._pending or self._in_flight):
+            raise RuntimeError("A MicroBatchDispatcher can only be used from one event loop at a time.")
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending = []
+        self._pending_size = 0
+        self._in_flight = 0
+        self.loop = loop
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        self.batched_phrases += self._pending_size
+        self._pending_size = 0
+        if batch:
+            self.batches += 1
+            self._in_flight += 1
+            self.loop.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        start_time = time.perf_counter()
+        try:
+            results = await self.loop.run_in_executor(self._executor, self.process_batch,
+                                                      [request for request, _, _ in batch])
+        except Exception as error:
+            results = [error] * len(batch)
+        completed = time.perf_counter()
+        self._in_flight -= 1
+        self.busy_seconds += completed - start_time
+        self._last_completed = completed
+
+        for (_, future, submitted), result in zip(batch, results):
+            self._latencies.append(completed - submitted)
+            if future.cancelled():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        """
+        Return the request and batch counters, the mean batch size, the request latency percentiles in
+        milliseconds and the throughput in requests per second since the first request.
+        """
+        latencies = np.array(self._latencies) * 1000
+        elapsed = (self._last_completed - self._first_submitted) if self._last_completed is not None else 0.0
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_phrases": self.batched_phrases / self.batches if self.batches else 0.0,
+            "latency_mean_ms": float(latencies.mean()) if len(latencies) else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "latency_p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            "busy_seconds": self.busy_seconds,
+            "requests_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        }
+
+    def close(self):
+        """
+        Stop the worker thread once the batches already dispatched are done.
+        """
+        self._executor.shutdown(wait=True)
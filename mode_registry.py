@@ -0,0 +1,99 @@
+import os
+import json
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+ControlEntry = namedtuple("ControlEntry", ["control", "file", "pose_index", "action_class", "method", "args"])
+
+
+def parse_mode_file(file_path):
+    """
+    Parse a mode file into its control table.
+
+    Parameters:
+    - file_path (str): Path to the mode JSON file.
+
+    Returns:
+    - A tuple of ControlEntry, one per pose that declares a control, in file order.
+    """
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+
+    entries = []
+    for pose_index, pose in enumerate(data.get('poses', [])):
+        if 'control' not in pose:
+            continue
+        # The action is either nested under 'action' or given by the pose's own class, method and args
+        action = pose.get('action') if isinstance(pose.get('action'), dict) else pose
+        args = action.get('args')
+        entries.append(ControlEntry(pose['control'], pose.get('file'), pose_index, action.get('class'),
+                                    action.get('method'), tuple(args) if isinstance(args, list) else args))
+    return tuple(entries)
+
+
+class ModeRegistry:
+    """
+    Parses each mode file of a directory once and keeps its control table, parsing a file again only when
+    its modification time changes.
+    """
+
+    def __init__(self, directory='modes'):
+        """
+        Initialize the ModeRegistry class.
+
+        Parameters:
+        - directory (str): Directory of the mode files.
+        """
+        self.directory = directory
+        self._modes = {}  # mode name -> (mtime_ns, control table, control texts)
+        self.parse_count = 0
+        self._lock = threading.Lock()
+
+    def entries(self, mode_name):
+        """
+        Return the control table of a mode as a tuple of ControlEntry.
+        """
+        return self._get(mode_name)[1]
+
+    def controls(self, mode_name):
+        """
+        Return the control texts of a mode, in file order.
+        """
+        return list(self._get(mode_name)[2])
+
+    def load_all(self, max_workers=8):
+        """
+        Parse every mode file of the directory that is not loaded yet or changed, in parallel.
+
+        Parameters:
+        - max_workers (int): Number of files read at the same time.
+
+        Returns:
+        - The names of the loaded modes.
+        """
+        mode_names = sorted(filename[:-5] for filename in os.listdir(self.directory) if filename.endswith(".json"))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(self._get, mode_names))
+        return mode_names
+
+    def _get(self, mode_name):
+        """
+        Return the cached (mtime_ns, control table, control texts) of a mode, parsing the file if it changed.
+        """
+        file_path = os.path.join(self.directory, f"{mode_name}.json")
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
+            self._modes.pop(mode_name, None)
+            raise ValueError(f"JSON file for mode '{mode_name}' does not exist in the directory.")
+
+        cached = self._modes.get(mode_name)
+        if cached is not None and cached[0] == mtime:
+            return cached
+        entries = parse_mode_file(file_path)
+        cached = (mtime, entries, tuple(entry.control for entry in entries))
+        with self._lock:
+            self._modes[mode_name] = cached
+            self.parse_count += 1
+        return cached
@@ -1,5 +1,15 @@
 import spacy
+import random
+import time
+import pickle
+import hashlib
+import numpy as np
 from spacy.training import Example
+from spacy.scorer import Scorer
+from spacy.util import minibatch, compounding
+from thinc.api import Config
+from threadpoolctl import threadpool_limits
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from train_test_data.training_data import TRAIN_DATA
 from train_test_data.test_data import TEST_DATA
 import matplotlib.pyplot as plt
@@ -35,17 +45,123 @@ def calculate_moving_average(scores, window_size):
         moving_avg.append((scores[i][0], avg))
     return moving_avg
 
-def train_and_evaluate_live(nlp, train_examples, test_examples, iterations, drop, range_size=10):
+# Optimizer state keyed by (model node id, parameter name)
+OPTIMIZER_STATE_ATTRS = ("mom1", "mom2", "averages", "nr_update", "last_seen")
+
+def model_node_names(nlp):
+    """
+    Map the id of every model node of the pipeline to a (component name, walk index) name. Node ids change
+    when a pipeline is rebuilt, so the optimizer state is checkpointed under these names.
+    """
+    names = {}
+    for pipe_name, proc in nlp.components:
+        model = getattr(proc, "model", None)
+        if hasattr(model, "walk"):
+            for index, node in enumerate(model.walk()):
+                names.setdefault(node.id, (pipe_name, index))
+    return names
+
+def get_optimizer_state(nlp, optimizer):
+    names = model_node_names(nlp)
+    state = {}
+    for attr in OPTIMIZER_STATE_ATTRS:
+        values = getattr(optimizer, attr, None)
+        if values is not None:
+            state[attr] = {(names[node_id], param): value for (node_id, param), value in values.items() if node_id in names}
+    return state
+
+def set_optimizer_state(nlp, optimizer, state):
+    node_ids = {name: node_id for node_id, name in model_node_names(nlp).items()}
+    for attr, values in state.items():
+        target = getattr(optimizer, attr)
+        target.clear()
+        target.update({(node_ids[name], param): value for (name, param), value in values.items() if name in node_ids})
+
+def save_training_state(checkpoint_path, state):
+    # Write to a temporary file first, so a run killed while saving keeps its previous checkpoint
+    with open(checkpoint_path + ".tmp", "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+def load_training_state(checkpoint_path, fingerprint):
+    """
+    Load the training state saved at checkpoint_path, or return None if there is none or it was saved for a
+    different fingerprint, so the run starts over.
+    """
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("fingerprint") != fingerprint:
+        print(f"Ignoring {checkpoint_path}: it was saved for a different pipeline, training data or settings, starting over")
+        return None
+    return state
+
+def examples_hash(examples):
     """
-    Train the spaCy model on the training data and evaluate on the test data every 10 iterations.
+    Hash the text and gold entities of the examples, in order.
+    """
+    digest = hashlib.sha256()
+    for example in examples:
+        entities = [(ent.start_char, ent.end_char, ent.label_) for ent in example.reference.ents]
+        digest.update(repr((example.reference.text, entities)).encode("utf8"))
+    return digest.hexdigest()
+
+def score_entities(nlp, examples, batch_size=256):
+    """
+    Score the predicted entities of the examples, running the pipeline over them in batches with nlp.pipe.
+    Only the entity scores are computed, instead of the scores of every component as in nlp.evaluate.
+
+    Returns:
+    - (f1, precision, recall) of the entities.
+    """
+    docs = nlp.pipe((nlp.make_doc(example.reference.text) for example in examples), batch_size=batch_size)
+    predicted = [Example(doc, example.reference) for doc, example in zip(docs, examples)]
+    scores = Scorer.score_spans(predicted, "ents")
+    return scores["ents_f"], scores["ents_p"], scores["ents_r"]
+
+def sample_dev_examples(examples, sample_size, seed=0):
+    """
+    Draw a fixed random subsample of the dev examples, or None if sample_size does not make it smaller.
+    A separate random generator is used, so the subsample does not shift the training shuffles.
+    """
+    if sample_size is None or sample_size >= len(examples):
+        return None
+    return random.Random(seed).sample(list(examples), sample_size)
+
+def train_and_evaluate_live(nlp, train_examples, test_examples, iterations, drop, range_size=10,
+                            batch_start=4.0, batch_stop=32.0, batch_compound=1.001, target_f1=None,
+                            patience=None, checkpoint_path=None, eval_every=10, dev_sample_size=None,
+                            eval_batch_size=256):
+    """
+    Train the spaCy model on the training data in shuffled minibatches and evaluate on the test data every eval_every iterations.
+
+    The weights are snapshotted in memory whenever the moving average F1 score improves, and the model is restored
+    to the best snapshot at the end, so it matches best_avg_iteration.
+
+    With dev_sample_size set, each evaluation first scores a fixed random subsample of the test data and runs the
+    full evaluation only when the subsample F1 score improves. The score lists hold the full evaluations only.
 
     Parameters:
     - nlp (spacy model): The spaCy model to train.
     - train_examples (list): The training data.
     - test_examples (list): The test data.
-    - iterations (int): Number of training iterations.
+    - iterations (int): Number of training iterations, each one a pass over the reshuffled training data.
     - drop (float): Dropout rate.
     - range_size (int): The size of the window used for calculating the moving average.
+    - batch_start (float): Size of the first minibatch.
+    - batch_stop (float): Size the minibatches grow towards.
+    - batch_compound (float): Factor the minibatch size is multiplied by after every minibatch.
+    - target_f1 (float): Test F1 score at which the wall-clock time since the start of training is reported.
+    - patience (int): Stop early once the moving average F1 score has not improved for this many iterations.
+      None trains all iterations.
+    - checkpoint_path (str): File the weights, optimizer and loop state are saved to at every evaluation. If it
+      exists and was saved for the same pipeline, training data, test data and settings, training resumes from it
+      instead of starting over.
+    - eval_every (int): Number of iterations between evaluations.
+    - dev_sample_size (int): Size of the test data subsample scored at every evaluation. None evaluates the full
+      test data every time.
+    - eval_batch_size (int): Number of documents processed per batch during evaluation.
 
     Returns:
     - f1_scores (list): F1 scores across iterations.
@@ -54,36 +170,175 @@ def train_and_evaluate_live(nlp, train_examples, test_examples, iterations, drop
     - moving_avg_scores (list): Moving average F1 scores.
     - best_avg_iteration (int): Iteration with the best moving average score.
     - best_avg_score (float): The best moving average score.
+    - training_stats (dict): Training examples per second, seconds spent in updates and in evaluations, number
+      of subsample and full evaluations, seconds to reach target_f1 (None if it was not reached) and the
+      iteration training stopped at.
     """
     optimizer = nlp.resume_training()  # Initialize the optimizer for training
-    f1_scores = []
-    accuracy_scores = []
-    recall_scores = []
+    train_examples = list(train_examples)
+    # A checkpoint is only resumed by a run with the same data and settings
+    fingerprint = None
+    if checkpoint_path is not None:
+        fingerprint = {
+            "iterations": iterations,
+            "drop": drop,
+            "range_size": range_size,
+            "batch_sizes": (batch_start, batch_stop, batch_compound),
+            "eval_every": eval_every,
+            "dev_sample_size": dev_sample_size,
+            "patience": patience,
+            # The pipeline the checkpointed weights belong to: its architecture, and the base model it came from
+            "pipeline": hashlib.sha256("\0".join([nlp.config.to_str(), nlp.meta.get("name", ""),
+                                                    nlp.meta.get("version", "")]).encode("utf8")).hexdigest(),
+            "train_examples": examples_hash(train_examples),
+            "test_examples": examples_hash(test_examples),
+        }
+    state = load_training_state(checkpoint_path, fingerprint)
+    if state is None:
+        state = {
+            "fingerprint": fingerprint,
+            "iteration": -1,
+            "f1_scores": [],
+            "accuracy_scores": [],
+            "recall_scores": [],
+            "best_bytes": None,
+            "best_iteration": None,
+            "best_score": None,
+            "order": list(range(len(train_examples))),
+            "sizes_drawn": 0,
+            "train_seconds": 0.0,
+            "eval_seconds": 0.0,
+            "sample_evaluations": 0,
+            "full_evaluations": 0,
+            "best_sample_f1": None,
+            "examples_seen": 0,
+            "seconds_to_target": None,
+            "finished": False,
+        }
+    else:
+        # Continue a killed run from its last evaluation
+        nlp.from_bytes(state["nlp_bytes"], exclude=["vocab"])
+        set_optimizer_state(nlp, optimizer, state["optimizer"])
+        random.setstate(state["random_state"])
+        np.random.set_state(state["numpy_random_state"])
+        if state["finished"]:
+            print(f"Training already finished at iteration {state['iteration']} in {checkpoint_path}")
+        else:
+            print(f"Resuming training from iteration {state['iteration'] + 1} of {checkpoint_path}")
+
+    f1_scores = state["f1_scores"]
+    accuracy_scores = state["accuracy_scores"]
+    recall_scores = state["recall_scores"]
+
+    # Minibatch sizes keep growing across iterations, from small noisy updates to larger stable ones
+    batch_sizes = compounding(batch_start, batch_stop, batch_compound)
+    for _ in range(state["sizes_drawn"]):
+        next(batch_sizes)
 
-    for i in range(iterations):
+    def counted_batch_sizes():
+        for size in batch_sizes:
+            state["sizes_drawn"] += 1
+            yield size
+
+    sizes = counted_batch_sizes()
+
+    def save_checkpoint():
+        state["nlp_bytes"] = nlp.to_bytes(exclude=["vocab"])
+        state["optimizer"] = get_optimizer_state(nlp, optimizer)
+        state["random_state"] = random.getstate()
+        state["numpy_random_state"] = np.random.get_state()
+        save_training_state(checkpoint_path, state)
+
+    dev_sample = sample_dev_examples(test_examples, dev_sample_size)
+    start_time = time.perf_counter() - state["train_seconds"] - state["eval_seconds"]
+
+    first_iteration = iterations if state["finished"] else state["iteration"] + 1
+    for i in range(first_iteration, iterations):
         losses = {}
-        nlp.update(train_examples, drop=drop, losses=losses, sgd=optimizer)
+        random.shuffle(state["order"])
+        update_start = time.perf_counter()
+        for batch in minibatch([train_examples[k] for k in state["order"]], size=sizes):
+            nlp.update(batch, drop=drop, losses=losses, sgd=optimizer)
+            state["examples_seen"] += len(batch)
+        state["train_seconds"] += time.perf_counter() - update_start
+        state["iteration"] = i
+
+        # Evaluate on the test data every `eval_every` iterations
+        if i % eval_every == 0:
+            eval_start = time.perf_counter()
+            full_evaluation = True
+            if dev_sample is not None:
+                # Score the subsample first and evaluate the full test data only when it improves
+                sample_f1, _, _ = score_entities(nlp, dev_sample, eval_batch_size)
+                state["sample_evaluations"] += 1
+                full_evaluation = state["best_sample_f1"] is None or sample_f1 > state["best_sample_f1"]
+                if full_evaluation:
+                    state["best_sample_f1"] = sample_f1
+            if full_evaluation:
+                f1_score, accuracy, recall = score_entities(nlp, test_examples, eval_batch_size)
+                state["full_evaluations"] += 1
+            state["eval_seconds"] += time.perf_counter() - eval_start
 
-        # Evaluate on the test data every 10 iterations
-        if i % 10 == 0:
-            scorer = nlp.evaluate(test_examples)
-            f1_score = scorer["ents_f"]
-            accuracy = scorer["ents_p"]
-            recall = scorer["ents_r"]
+            if not full_evaluation:
+                print(f"Iteration {i}, Losses: {losses}, Dev Sample F1 Score: {sample_f1:.3f}, no improvement")
+            else:
+                f1_scores.append((i, f1_score))
+                accuracy_scores.append((i, accuracy))
+                recall_scores.append((i, recall))
 
-            f1_scores.append((i, f1_score))
-            accuracy_scores.append((i, accuracy))
-            recall_scores.append((i, recall))
+                print(f"Iteration {i}, Losses: {losses}, Test F1 Score: {f1_score:.3f}, Accuracy: {accuracy:.3f}, Recall: {recall:.3f}")
 
-            print(f"Iteration {i}, Losses: {losses}, Test F1 Score: {f1_score:.3f}, Accuracy: {accuracy:.3f}, Recall: {recall:.3f}")
+                if target_f1 is not None and state["seconds_to_target"] is None and f1_score >= target_f1:
+                    state["seconds_to_target"] = time.perf_counter() - start_time
+                    print(f"Reached the target F1 score of {target_f1:.3f} after {state['seconds_to_target']:.1f}s")
+
+                # Snapshot the weights at every new best moving average score
+                window = [score for _, score in f1_scores[-range_size:]]
+                moving_avg = sum(window) / len(window)
+                if state["best_score"] is None or moving_avg > state["best_score"]:
+                    state["best_score"] = moving_avg
+                    state["best_iteration"] = i
+                    state["best_bytes"] = nlp.to_bytes(exclude=["vocab"])
+
+            if patience is not None and i - state["best_iteration"] >= patience:
+                print(f"Stopping early at iteration {i}: no improvement of the moving average F1 score since iteration {state['best_iteration']}")
+                state["finished"] = True
+
+            if checkpoint_path is not None:
+                save_checkpoint()
+
+            if state["finished"]:
+                break
+
+    if checkpoint_path is not None and not state["finished"]:
+        # Mark the run as complete, so running it again returns the result without training
+        state["finished"] = True
+        save_checkpoint()
+
+    # Restore the weights of the best moving average score
+    if state["best_bytes"] is not None:
+        nlp.from_bytes(state["best_bytes"], exclude=["vocab"])
+
+    train_seconds = state["train_seconds"]
+    eval_seconds = state["eval_seconds"]
+    training_stats = {
+        "examples_per_second": state["examples_seen"] / train_seconds if train_seconds else 0.0,
+        "train_seconds": train_seconds,
+        "eval_seconds": eval_seconds,
+        "sample_evaluations": state["sample_evaluations"],
+        "full_evaluations": state["full_evaluations"],
+        "seconds_to_target_f1": state["seconds_to_target"],
+        "stopped_at_iteration": state["iteration"],
+    }
+    print(f"Trained on {training_stats['examples_per_second']:.1f} examples/sec")
+    print(f"Spent {train_seconds:.1f}s training and {eval_seconds:.1f}s evaluating "
+          f"({eval_seconds / (train_seconds + eval_seconds) if train_seconds + eval_seconds else 0.0:.0%} of the time), "
+          f"with {state['full_evaluations']} full and {state['sample_evaluations']} subsample evaluations")
 
     # Calculate the moving average F1 score over the last `range_size` iterations
     moving_avg_scores = calculate_moving_average(f1_scores, range_size)
 
-    # Find the iteration with the best moving average score
-    best_avg_iteration, best_avg_score = max(moving_avg_scores, key=lambda x: x[1])
-
-    return f1_scores, accuracy_scores, recall_scores, moving_avg_scores, best_avg_iteration, best_avg_score
+    return f1_scores, accuracy_scores, recall_scores, moving_avg_scores, state["best_iteration"], state["best_score"], training_stats
 
 def plot_metric_combined(scores_dict, metric_name, ylabel):
     for drop, scores in scores_dict.items():
@@ -97,64 +352,170 @@ def plot_metric_combined(scores_dict, metric_name, ylabel):
     plt.grid(True)
     plt.show()
 
-def train_ner_multiple_drops(train_data, test_data, output_path, iterations, dropout_values):
+def prepare_pipeline(base_model, train_data):
+    """
+    Load the base model and customize its pipeline for training.
+
+    Parameters:
+    - base_model (str): Name or path of the spaCy model to start from.
+    - train_data (list): The training data, whose entity labels are added to the NER component.
+
+    Returns:
+    - nlp (spacy model): The pipeline with tok2vec, parser, ner and the vocabulary entity matcher.
+    """
+    nlp = spacy.load(base_model)
+
+    # Customize the pipeline
+    keep_pipes = {"ner", "parser", "tok2vec"}
+    for pipe_name in list(nlp.pipe_names):
+        if pipe_name not in keep_pipes:
+            nlp.remove_pipe(pipe_name)
+    nlp.remove_pipe("senter")
+    nlp.add_pipe("vocabulary_entity_matcher", last=True)
+
+    # Add NER labels
+    add_ner_labels(nlp, train_data)
+    return nlp
+
+def pipeline_from_bytes(config, bytes_data):
+    """
+    Rebuild a pipeline serialized with nlp.config.to_str() and nlp.to_bytes().
+    """
+    nlp = spacy.util.load_model_from_config(Config().from_str(config), auto_fill=False, validate=False)
+    return nlp.from_bytes(bytes_data)
+
+def serialize_base_pipeline(base_model, train_data):
+    """
+    Load and customize the base pipeline once and serialize it, so every trial starts from a copy instead of
+    loading the base model and its vectors again.
+
+    Returns:
+    - base_pipeline (tuple): The config string and bytes of the customized pipeline, for pipeline_from_bytes.
+    """
+    nlp = prepare_pipeline(base_model, train_data)
+    return nlp.config.to_str(), nlp.to_bytes()
+
+# The serialized base pipeline of a trial worker, set once per worker by init_trial_worker
+_base_pipeline = None
+
+def init_trial_worker(threads_per_worker, base_pipeline):
+    """
+    Set up a trial worker: limit its BLAS and OpenMP thread pools, so parallel trials do not oversubscribe
+    the cores, and keep the serialized base pipeline its trials start from.
+    """
+    global _base_pipeline
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(threads_per_worker)
+    threadpool_limits(threads_per_worker)
+    _base_pipeline = base_pipeline
+
+def train_dropout_trial(train_data, test_data, iterations, drop, target_f1=None, patience=None, checkpoint_dir=None,
+                        dev_sample_size=None):
+    """
+    Train and evaluate one dropout rate from a fresh copy of the base pipeline. Runs in a worker process.
+
+    Parameters:
+    - checkpoint_dir (str): Directory of the resumable training state of each dropout rate. None disables checkpoints.
+    - dev_sample_size (int): Size of the test data subsample scored before deciding on a full evaluation.
+
+    Returns:
+    - result (dict): The dropout rate, the setup time, the outputs of train_and_evaluate_live and the
+      bytes of the trained pipeline without its vocab, to be loaded into a copy of the base pipeline.
+    """
+    # Start each dropout rate from a fresh copy of the customized base pipeline
+    setup_start = time.perf_counter()
+    nlp = pipeline_from_bytes(*_base_pipeline)
+    setup_seconds = time.perf_counter() - setup_start
+
+    # Prepare training and test examples
+    train_examples = prepare_examples(nlp, train_data)
+    test_examples = prepare_examples(nlp, test_data)
+
+    # Train and evaluate with this dropout rate
+    checkpoint_path = os.path.join(checkpoint_dir, f"dropout_{drop}.pkl") if checkpoint_dir is not None else None
+    f1_scores, accuracy_scores, recall_scores, moving_avg_scores, best_iter, avg_score, training_stats = \
+        train_and_evaluate_live(nlp, train_examples, test_examples, iterations, drop, target_f1=target_f1,
+                                patience=patience, checkpoint_path=checkpoint_path, dev_sample_size=dev_sample_size)
+    return {"drop": drop, "setup_seconds": setup_seconds, "f1_scores": f1_scores, "accuracy_scores": accuracy_scores, "recall_scores": recall_scores,
+            "moving_avg_scores": moving_avg_scores, "best_iteration": best_iter, "best_avg_score": avg_score,
+            "training_stats": training_stats, "bytes": nlp.to_bytes(exclude=["vocab"])}
+
+def train_ner_multiple_drops(train_data, test_data, output_path, iterations, dropout_values, target_f1=None,
+                             base_model="en_core_web_md", max_workers=None, threads_per_worker=1, patience=None,
+                             checkpoint_dir=None, dev_sample_size=None):
+    """
+    Train one trial per dropout rate in a pool of worker processes and save the best one.
+
+    Parameters:
+    - max_workers (int): Number of trials trained at the same time. Defaults to as many as the cores allow
+      with threads_per_worker threads each.
+    - threads_per_worker (int): Number of BLAS/OpenMP threads of each worker.
+    - patience (int): Stop a trial early once its moving average F1 score has not improved for this many iterations.
+    - checkpoint_dir (str): Directory the trials checkpoint their training state to, so a killed sweep resumes
+      where it stopped.
+    - dev_sample_size (int): Size of the test data subsample that decides whether a full evaluation is run.
+    """
     f1_scores_dict = {}
     accuracy_scores_dict = {}
     recall_scores_dict = {}
     moving_avg_dict = {}
-    best_model = None
+    best_result = None
     best_avg_score = 0
-    best_avg_dropout = None
-    best_avg_iteration = 0
-
-    for drop in dropout_values:
-        # Load and configure the base model from scratch for each dropout rate
-        nlp = spacy.load("en_core_web_md")
-
-        # Prepare training and test examples
-        train_examples = prepare_examples(nlp, train_data)
-        test_examples = prepare_examples(nlp, test_data)
-
-        # Customize the pipeline
-        keep_pipes = {"ner", "parser", "tok2vec"}
-        for pipe_name in list(nlp.pipe_names):
-            if pipe_name not in keep_pipes:
-                nlp.remove_pipe(pipe_name)
-        nlp.remove_pipe("senter")
-        nlp.add_pipe("modes_entity_matcher", last=True)
-        nlp.add_pipe("poses_entity_matcher", last=True)
-
-        # Add NER labels
-        add_ner_labels(nlp, train_data)
-
-        # Train and evaluate with this dropout rate
-        f1_scores, accuracy_scores, recall_scores, moving_avg_scores, best_iter, avg_score = train_and_evaluate_live(nlp, train_examples, test_examples, iterations, drop)
-        f1_scores_dict[drop] = f1_scores
-        accuracy_scores_dict[drop] = accuracy_scores
-        recall_scores_dict[drop] = recall_scores
-        moving_avg_dict[drop] = moving_avg_scores
-
-        # Update the best model based on the highest average F1 score
-        if avg_score > best_avg_score:
-            best_avg_score = avg_score
-            best_model = nlp
-            best_avg_dropout = drop
-            best_avg_iteration = best_iter
+
+    setup_start = time.perf_counter()
+    base_pipeline = serialize_base_pipeline(base_model, train_data)
+    print(f"Loaded and customized {base_model} once in {time.perf_counter() - setup_start:.2f}s")
+
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    if max_workers is None:
+        max_workers = max(1, min(len(dropout_values), (os.cpu_count() or 1) // threads_per_worker))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_trial_worker,
+                             initargs=(threads_per_worker, base_pipeline)) as executor:
+        futures = [executor.submit(train_dropout_trial, train_data, test_data, iterations, drop, target_f1,
+                                   patience, checkpoint_dir, dev_sample_size)
+                   for drop in dropout_values]
+
+        # Collect the trials as they finish, keeping only the best trained pipeline
+        for future in as_completed(futures):
+            result = future.result()
+            drop = result["drop"]
+            f1_scores_dict[drop] = result["f1_scores"]
+            accuracy_scores_dict[drop] = result["accuracy_scores"]
+            recall_scores_dict[drop] = result["recall_scores"]
+            moving_avg_dict[drop] = result["moving_avg_scores"]
+            print(f"Dropout {drop} finished: set up in {result['setup_seconds']:.2f}s, best moving average F1 "
+                  f"{result['best_avg_score']:.3f} at iteration {result['best_iteration']}, "
+                  f"{result['training_stats']['examples_per_second']:.1f} examples/sec, stopped at iteration "
+                  f"{result['training_stats']['stopped_at_iteration']}, {result['training_stats']['train_seconds']:.1f}s "
+                  f"training and {result['training_stats']['eval_seconds']:.1f}s evaluating")
+
+            # Update the best model based on the highest average F1 score
+            if result["best_avg_score"] > best_avg_score:
+                best_avg_score = result["best_avg_score"]
+                best_result = result
 
     # Save the best-performing model
-    if best_model:
-        best_model.to_disk(output_path)
-        print(f"The best model was saved with a dropout rate of {best_avg_dropout} at iteration {best_avg_iteration}, based on the highest moving average F1 score.")
+    if best_result:
+        # Trials send back their weights without the vocab and vectors, which the base pipeline already holds
+        nlp = pipeline_from_bytes(*base_pipeline)
+        nlp.from_bytes(best_result["bytes"], exclude=["vocab"])
+        nlp.to_disk(output_path)
+        print(f"The best model was saved with a dropout rate of {best_result['drop']} at iteration {best_result['best_iteration']}, based on the highest moving average F1 score.")
+
+    # Plot combined graphs for each metric, in the order of the dropout values
+    def in_dropout_order(scores_dict):
+        return {drop: scores_dict[drop] for drop in dropout_values}
 
-    # Plot combined graphs for each metric
-    plot_metric_combined(f1_scores_dict, "F1 Score", "F1 Score")
-    plot_metric_combined(accuracy_scores_dict, "Accuracy", "Accuracy")
-    plot_metric_combined(recall_scores_dict, "Recall", "Recall")
+    plot_metric_combined(in_dropout_order(f1_scores_dict), "F1 Score", "F1 Score")
+    plot_metric_combined(in_dropout_order(accuracy_scores_dict), "Accuracy", "Accuracy")
+    plot_metric_combined(in_dropout_order(recall_scores_dict), "Recall", "Recall")
 
     # Plot the moving average F1 scores for each dropout rate
-    plot_metric_combined(moving_avg_dict, "Moving Average F1 Score (Last 10 Iterations)", "Moving Average F1 Score")
+    plot_metric_combined(in_dropout_order(moving_avg_dict), "Moving Average F1 Score (Last 10 Iterations)", "Moving Average F1 Score")
 
-def main(output_dir, iterations=1000, dropout_values=[0.1, 0.3, 0.5]):
+def main(output_dir, iterations=1000, dropout_values=[0.1, 0.3, 0.5], target_f1=None, base_model="en_core_web_md",
+         max_workers=None, threads_per_worker=1, patience=None, checkpoint_dir=None, dev_sample_size=None):
     # Prepare training and test data
     train_data = TRAIN_DATA
     test_data = TEST_DATA
@@ -163,7 +524,9 @@ def main(output_dir, iterations=1000, dropout_values=[0.1, 0.3, 0.5]):
     output_dir = os.path.abspath(output_dir)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    train_ner_multiple_drops(train_data, test_data, output_dir, iterations, dropout_values)
+    train_ner_multiple_drops(train_data, test_data, output_dir, iterations, dropout_values, target_f1=target_f1,
+                             base_model=base_model, max_workers=max_workers, threads_per_worker=threads_per_worker,
+                             patience=patience, checkpoint_dir=checkpoint_dir, dev_sample_size=dev_sample_size)
 
 if __name__ == "__main__":
     output_folder = "nlp_model"  # Update with your desired folder path
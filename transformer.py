@@ -1,6 +1,29 @@
 import os
-import json
-from sentence_transformers import SentenceTransformer, util
+import time
+import hashlib
+import threading
+import numpy as np
+from embedding_cache import EmbeddingCache, model_identity
+from embedding_index import (CatalogIndex, CompactEmbeddings, EmbeddingProjection, normalize_embeddings, rank_top_k,
+                             read_catalog_entries, read_catalog_sources)
+from match_dispatcher import MicroBatchDispatcher
+from mode_registry import ModeRegistry
+
+INFERENCE_MODES = ("float", "quantized")
+
+
+def quantized_model_path(model_path):
+    """
+    Return the path of the dynamically quantized copy of a model, saved next to the model directory.
+    """
+    return f"{os.path.normpath(model_path)}_int8.pt"
+
+
+def projection_path(model_path, dimension, method='pca'):
+    """
+    Return the path of a dimensionality reduction of a model's embeddings, saved next to the model directory.
+    """
+    return f"{os.path.normpath(model_path)}_{method}{dimension}.npz"
 
 
 class NamedEntityMatcher:
@@ -8,59 +31,367 @@ class NamedEntityMatcher:
     A class to match named entities to the most similar file names and controls using a Sentence Transformer model.
     """
 
-    def __init__(self, model_path='transformer_model', similarity_threshold=0.8):
+    def __init__(self, model_path='transformer_model', similarity_threshold=0.8, cache_dir='embedding_cache',
+                 cache_size=10000, search_backend='exact', search_options=None, query_cache_size=1000,
+                 query_cache_dir=None, embedding_precision='float32', warmup=False, inference_mode='float',
+                 num_threads=None, batch_wait_ms=5.0, max_batch_size=64, length_buckets=(8, 16, 32),
+                 static_vectors=None, static_accept_threshold=0.85, static_margin=0.1, projection_dimension=None,
+                 projection_method='pca'):
         """
         Initialize the NamedEntityMatcher class.
 
         Parameters:
         - model_path (str): Path to the fine-tuned model directory to use.
         - similarity_threshold (float): Minimum cosine similarity score for a match to be considered.
+        - cache_dir (str): Directory of the on-disk control embedding cache. None keeps the cache in memory only.
+        - cache_size (int): Maximum number of control embeddings kept in memory.
+        - search_backend (str): Catalog search backend, 'exact' or the approximate 'ivf'.
+        - search_options (dict): Keyword arguments of the search backend, e.g. {'n_probe': 8} for 'ivf'.
+        - query_cache_size (int): Maximum number of action phrase embeddings memoized in memory.
+        - query_cache_dir (str): Directory to persist the action phrase embeddings across restarts. None keeps
+          them in memory only.
+        - embedding_precision (str): Storage precision of the catalog index embeddings: 'float32', 'float16'
+          or 'int8' with one scale per embedding. Scores are computed on the compact values.
+        - warmup (bool): Load the model and run a dummy encode in a background thread right away. Otherwise
+          sentence_transformers is imported and the model is loaded on first use.
+        - inference_mode (str): 'float' runs the model as trained. 'quantized' applies dynamic int8 quantization
+          to its linear layers for faster CPU inference and caches the result in quantized_model_path(model_path).
+        - num_threads (int): Number of intra-op threads torch uses for inference. None keeps the torch default.
+        - batch_wait_ms (float): How long amatch waits for concurrent requests to join a batch.
+        - max_batch_size (int): Number of action phrases that dispatches an amatch batch right away.
+        - length_buckets (tuple of int): Token lengths at which texts are split into separately encoded buckets,
+          each with max_seq_length capped to its bound, so short controls are not padded to a long dictated
+          sentence in the same batch. None encodes every batch as a whole.
+        - static_vectors (str or Language): A spaCy pipeline with word vectors, or the name of one to load on first
+          use such as 'en_core_web_md', enabling a cheap first matching stage. Actions whose content lemmas equal
+          those of a control, or whose averaged word vector is clearly closest to one control, are matched
+          without the transformer. Their scores are 1.0 or the word vector similarity, which similarity_threshold
+          does not apply to. None matches every action with the transformer.
+        - static_accept_threshold (float): Minimum averaged word vector similarity accepted by the cheap stage.
+        - static_margin (float): Minimum lead of the best control over the second best for the cheap stage to
+          decide; closer calls fall back to the transformer.
+        - projection_dimension (int): Reduce the catalog index and search_catalog queries to this many dimensions,
+          e.g. 32, 64 or 128. The similarity threshold then applies to the reduced cosine similarities. None
+          keeps the full dimension of the model.
+        - projection_method (str): 'pca' fitted on the catalog, or 'random' for a random projection. The
+          projection is saved in projection_path(model_path, projection_dimension, projection_method).
         """
-        self.model = SentenceTransformer(model_path)  # Load the fine-tuned model
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode '{inference_mode}', expected one of {INFERENCE_MODES}.")
+        self.model_path = model_path
+        self.inference_mode = inference_mode
+        self.num_threads = num_threads
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self.length_buckets = tuple(sorted(length_buckets)) if length_buckets else None
+        self._warmup_thread = None
+        self._warmed_up = False
+        self.model_load_seconds = None
         self.similarity_threshold = similarity_threshold
+        self.model_id = model_identity(model_path)
+        if inference_mode == 'quantized':
+            # The quantized model produces slightly different embeddings, so it must not share cached ones
+            self.model_id = hashlib.sha256(f"{self.model_id}:int8".encode("utf8")).hexdigest()
+        self.control_cache = EmbeddingCache(self.model_id, cache_dir=cache_dir, max_entries=cache_size)
+        self.query_cache = EmbeddingCache(self.model_id, cache_dir=query_cache_dir, max_entries=query_cache_size)
+        self.query_encode_seconds = 0.0  # Time spent encoding the action phrases missing from the query cache
+        self.query_encode_count = 0
+        self.catalog_index = None
+        self.search_backend = search_backend
+        self.search_options = search_options
+        self.embedding_precision = embedding_precision
+        self.static_vectors = static_vectors
+        self.static_accept_threshold = static_accept_threshold
+        self.static_margin = static_margin
+        self._static_nlp = None
+        self._static_controls = {}  # Lemma key and unit word vector of every control seen by the cheap stage
+        self.mode_registries = {}  # Parsed mode files of every directory matched against
+        self.projection_dimension = projection_dimension
+        self.projection_method = projection_method
+        self.projection = None
+        if projection_dimension is not None:
+            path = projection_path(model_path, projection_dimension, projection_method)
+            if os.path.exists(path):
+                projection = EmbeddingProjection.load(path)
+                # A projection fitted on another model's embeddings is fitted again by build_catalog_index
+                if projection.model_id == self.model_id:
+                    self.projection = projection
+        self.static_match_count = 0
+        self.fallback_count = 0
+        self.dispatcher = MicroBatchDispatcher(self._match_batch, max_wait_ms=batch_wait_ms,
+                                               max_batch_size=max_batch_size)
+        if warmup:
+            self.start_warmup()
+
+    @property
+    def model(self):
+        """
+        The fine-tuned SentenceTransformer, loaded on first access. Accesses made while a warmup is loading
+        the model block until it is ready.
+        """
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    start_time = time.perf_counter()
+                    # Imported here since sentence_transformers pulls in torch and transformers
+                    import torch
+                    from sentence_transformers import SentenceTransformer
+                    if self.num_threads is not None:
+                        torch.set_num_threads(self.num_threads)
+                    if self.inference_mode == 'quantized':
+                        self._model = self._load_quantized_model()
+                    else:
+                        self._model = SentenceTransformer(self.model_path)  # Load the fine-tuned model
+                    self.model_load_seconds = time.perf_counter() - start_time
+        return self._model
+
+    def _load_quantized_model(self):
+        """
+        Load the cached quantized model, or quantize the model and cache it if the cache is missing or stale.
+        """
+        import torch
+        from torch.ao.quantization import quantize_dynamic
+        from sentence_transformers import SentenceTransformer
+
+        cache_path = quantized_model_path(self.model_path)
+        if os.path.exists(cache_path):
+            saved = torch.load(cache_path, map_location='cpu', weights_only=False)
+            if saved["model_id"] == self.model_id:
+                return saved["model"]
+
+        model = SentenceTransformer(self.model_path, device='cpu')
+        model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        torch.save({"model_id": self.model_id, "model": model}, cache_path + ".tmp")
+        os.replace(cache_path + ".tmp", cache_path)
+        return model
+
+    def start_warmup(self):
+        """
+        Load the model and run a dummy encode in a daemon thread, so the first match does not pay for them.
+
+        Returns:
+        - The warmup thread.
+        """
+        if self._warmup_thread is None:
+            self._warmup_thread = threading.Thread(target=self._warmup, name="NamedEntityMatcher-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+    def wait_until_ready(self, timeout=None):
+        """
+        Wait for the warmup started by start_warmup to finish, or load the model now if none was started.
+
+        Returns:
+        - True if the model is loaded.
+        """
+        if self._warmup_thread is not None:
+            self._warmup_thread.join(timeout)
+        else:
+            self.model
+        return self._model is not None
+
+    def _warmup(self):
+        try:
+            self.encode_texts(["warmup"])
+            self._warmed_up = True
+        except Exception:
+            # Errors surface on the first real call, which loads the model again if loading failed here
+            pass
+
+    def encode_controls(self, controls):
+        """
+        Encode control values, reusing cached embeddings and encoding only the uncached ones in one batch.
+
+        Parameters:
+        - controls (list of str): The control values to encode.
+
+        Returns:
+        - A float32 matrix with one embedding row per control value.
+        """
+        embeddings, _, _ = self._encode_cached(controls, self.control_cache)
+        return embeddings
+
+    def encode_queries(self, actions):
+        """
+        Encode action phrases, memoized on their normalized text: only the phrases missing from the
+        query cache are sent to the encoder, in one batch.
+
+        Parameters:
+        - actions (list of str): The action phrases to encode.
+
+        Returns:
+        - A float32 matrix with one embedding row per action phrase.
+        """
+        phrases = [" ".join(action.lower().split()) for action in actions]
+        embeddings, encoded_count, encode_seconds = self._encode_cached(phrases, self.query_cache)
+        if encoded_count:
+            self.query_encode_seconds += encode_seconds
+            self.query_encode_count += encoded_count
+        return embeddings
+
+    def query_cache_stats(self):
+        """
+        Return the query cache counters, with an estimate of the encoding time saved by the cache hits
+        based on the mean encoding time of the missed phrases.
+        """
+        stats = self.query_cache.stats()
+        seconds_per_phrase = self.query_encode_seconds / self.query_encode_count if self.query_encode_count else 0.0
+        stats["encode_seconds"] = self.query_encode_seconds
+        stats["saved_seconds"] = stats["hits"] * seconds_per_phrase
+        return stats
+
+    def encode_texts(self, texts):
+        """
+        Encode texts with the model, bucketing them by token length when length_buckets is set.
+
+        Each bucket is encoded on its own with max_seq_length capped to the bucket bound, and the embeddings
+        are returned in the order of the texts. Every encode holds _encode_lock, so no thread encodes while
+        another one has the shared max_seq_length lowered to a bucket bound.
+
+        Parameters:
+        - texts (list of str): The texts to encode.
+
+        Returns:
+        - A float32 matrix with one embedding row per text.
+        """
+        model = self.model
+        with self._encode_lock:
+            if not self.length_buckets or len(texts) < 2:
+                return model.encode(texts, convert_to_numpy=True)
+
+            lengths = np.array([len(ids) for ids in model.tokenizer(list(texts), add_special_tokens=True)["input_ids"]])
+            max_seq_length = model.max_seq_length
+            bounds = [bound for bound in self.length_buckets if bound < max_seq_length] + [max_seq_length]
+            # Texts longer than max_seq_length land in the last bucket and are truncated as before
+            buckets = np.minimum(np.searchsorted(bounds, lengths), len(bounds) - 1)
+
+            embeddings = None
+            try:
+                for bucket in np.unique(buckets):
+                    rows = np.flatnonzero(buckets == bucket)
+                    model.max_seq_length = bounds[bucket]
+                    bucket_embeddings = model.encode([texts[row] for row in rows], convert_to_numpy=True)
+                    if embeddings is None:
+                        embeddings = np.empty((len(texts), bucket_embeddings.shape[1]), dtype=bucket_embeddings.dtype)
+                    embeddings[rows] = bucket_embeddings
+            finally:
+                model.max_seq_length = max_seq_length
+        return embeddings
+
+    def _encode_cached(self, texts, cache):
+        """
+        Encode texts through an EmbeddingCache and return the embedding matrix, the number of texts encoded and
+        the seconds spent encoding them, not counting the loading of the model and its first encode.
+        """
+        embeddings = cache.get_many(texts)
+        missing = sorted({text for text, embedding in zip(texts, embeddings) if embedding is None})
+        encode_seconds = 0.0
+        if missing:
+            if not self._warmed_up:
+                # Load the model and run its one-off first encode outside the timed section, waiting for the
+                # background warmup instead if one was started
+                if self._warmup_thread is not None:
+                    self.wait_until_ready()
+                else:
+                    self._warmup()
+            start_time = time.perf_counter()
+            encoded = dict(zip(missing, self.encode_texts(missing)))
+            encode_seconds = time.perf_counter() - start_time
+            for text, embedding in encoded.items():
+                cache.put(text, embedding)
+            embeddings = [embedding if embedding is not None else encoded[text]
+                          for text, embedding in zip(texts, embeddings)]
+        return np.stack(embeddings), len(missing), encode_seconds
+
+    def similarity_matrix(self, entity_embeddings, target_embeddings):
+        """
+        Compute the cosine similarity of every entity embedding with every target embedding in one matrix product.
+
+        The target embeddings may be CompactEmbeddings, which are scored directly on their stored precision.
+
+        Returns:
+        - A (number of entities, number of targets) float32 matrix of cosine similarities.
+        """
+        if isinstance(target_embeddings, CompactEmbeddings):
+            return target_embeddings.dot(normalize_embeddings(entity_embeddings))
+        return normalize_embeddings(entity_embeddings) @ normalize_embeddings(target_embeddings).T
 
     def find_best_match(self, entity_embeddings, target_embeddings):
         """
         Find the best match for each entity embedding against the target embeddings.
 
         Parameters:
-        - entity_embeddings (tensor): Embeddings of the entities.
-        - target_embeddings (tensor): Embeddings of the target items (file names or controls).
+        - entity_embeddings (array or tensor): Embeddings of the entities.
+        - target_embeddings (array, tensor or CompactEmbeddings): Embeddings of the target items (file names or controls).
 
         Returns:
         - A dictionary mapping each entity index to a tuple containing the best matching index and cosine similarity score.
         """
-        results = {}
-        for idx, entity_embedding in enumerate(entity_embeddings):
-            cosine_similarities = util.cos_sim(entity_embedding, target_embeddings)
-            best_match_idx = cosine_similarities.argmax()
-            best_score = float(cosine_similarities[0, best_match_idx])  # Convert tensor to float
+        similarities = self.similarity_matrix(entity_embeddings, target_embeddings)
+        best_indices = similarities.argmax(axis=1)
+        best_scores = similarities[np.arange(len(similarities)), best_indices]
+
+        # Only consider matches that meet or exceed the similarity threshold
+        matched = np.flatnonzero(best_scores >= self.similarity_threshold)
+        return {int(idx): (int(best_indices[idx]), float(best_scores[idx])) for idx in matched}
 
-            # Only consider matches that meet or exceed the similarity threshold
-            if best_score >= self.similarity_threshold:
-                results[idx] = (best_match_idx, best_score)
+    def find_top_k(self, entity_embeddings, target_embeddings, top_k=5):
+        """
+        Find the top_k best matches for each entity embedding against the target embeddings.
+
+        Parameters:
+        - entity_embeddings (array or tensor): Embeddings of the entities.
+        - target_embeddings (array, tensor or CompactEmbeddings): Embeddings of the target items (file names or controls).
+        - top_k (int): Maximum number of matches returned per entity.
+
+        Returns:
+        - A dictionary mapping each entity index to a list of (target index, cosine similarity score) tuples,
+          ranked from best to worst. Only scores meeting the similarity threshold are kept, and entities
+          without any such match are left out.
+        """
+        similarities = self.similarity_matrix(entity_embeddings, target_embeddings)
+        ranked, ranked_scores = rank_top_k(similarities, top_k)
+        above_threshold = ranked_scores >= self.similarity_threshold
 
+        results = {}
+        for idx in np.flatnonzero(above_threshold[:, 0]):
+            keep = above_threshold[idx]
+            results[int(idx)] = [(int(target_idx), float(score))
+                                 for target_idx, score in zip(ranked[idx][keep], ranked_scores[idx][keep])]
         return results
 
     def load_controls_from_json(self, directory, mode_name):
         """
-        Load control values from a specific JSON file representing the mode.
+        Load control values from a specific JSON file representing the mode. The file is parsed once and
+        parsed again only when its modification time changes.
 
         Parameters:
         - directory (str): Path to the directory containing the mode file.
         - mode_name (str): The base name of the mode file to load.
 
         Returns:
-        - List of control values from the specified mode file.
+        - List of control values from the specified mode file, for the poses that declare one.
+        """
+        return self.mode_registry(directory).controls(mode_name)
+
+    def mode_registry(self, directory='modes'):
+        """
+        Return the ModeRegistry of a directory of mode files, creating it on first use.
         """
-        json_file_path = os.path.join(directory, f"{mode_name}.json")
-        if not os.path.exists(json_file_path):
-            raise ValueError(f"JSON file for mode '{mode_name}' does not exist in the directory.")
+        registry = self.mode_registries.get(directory)
+        if registry is None:
+            registry = self.mode_registries[directory] = ModeRegistry(directory)
+        return registry
 
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
+    def preload_modes(self, directory='modes', max_workers=8):
+        """
+        Parse every mode file of a directory in parallel, e.g. at startup, so the first matches do not read them.
 
-        return [pose['control'] for pose in data.get('poses', [])]
+        Returns:
+        - The names of the loaded modes.
+        """
+        return self.mode_registry(directory).load_all(max_workers=max_workers)
 
     def match_actions_to_controls(self, directory, mode_name, actions):
         """
@@ -72,17 +403,28 @@ class NamedEntityMatcher:
         - actions (list of str): List of actions to compare against control values.
 
         Returns:
-        - A dictionary mapping each action to a tuple containing the best matching control and its cosine similarity score.
+        - A dictionary mapping each action to a tuple containing the best matching control and its score. The
+          score depends on the stage that decided the match:
+          - transformer stage: the cosine similarity of the sentence embeddings, at least similarity_threshold.
+          - cheap stage (static_vectors set), same content lemmas as the control: 1.0.
+          - cheap stage, word vectors: the cosine similarity of the averaged word vectors, at least
+            static_accept_threshold and not compared with similarity_threshold.
+          Scores of the two stages are not on the same scale, so they should not be thresholded together.
         """
         all_controls = self.load_controls_from_json(directory, mode_name)
         if not all_controls:
             raise ValueError(f"No control values found in the JSON file for mode '{mode_name}'.")
 
-        # Encode the control values using the model
-        control_embeddings = self.model.encode(all_controls, convert_to_tensor=True)
+        # Decide the clear-cut actions with the cheap stage and encode only the others
+        results, ambiguous = self._match_static(all_controls, actions)
+        if ambiguous:
+            # Encode the remaining actions, reusing the memoized phrases
+            results.update(self._match_embeddings_to_controls(all_controls, ambiguous, self.encode_queries(ambiguous)))
+        return {action: results[action] for action in actions if action in results}
 
-        # Encode the provided actions
-        action_embeddings = self.model.encode(actions, convert_to_tensor=True)
+    def _match_embeddings_to_controls(self, all_controls, actions, action_embeddings):
+        # Encode the control values, reusing the cached embeddings
+        control_embeddings = self.encode_controls(all_controls)
 
         # Find the best match for each action
         match_indices = self.find_best_match(action_embeddings, control_embeddings)
@@ -93,6 +435,269 @@ class NamedEntityMatcher:
 
         return results
 
+    async def amatch(self, directory, mode_name, actions):
+        """
+        Asynchronous match_actions_to_controls. Concurrent calls are collected for up to batch_wait_ms, or until
+        max_batch_size phrases are waiting, and their actions are encoded together in one batch on a worker thread.
+        Scores have the same per-stage meaning as in match_actions_to_controls.
+
+        Parameters:
+        - directory (str): Path to the directory containing the mode file.
+        - mode_name (str): The base name of the mode file to compare against.
+        - actions (list of str): List of actions to compare against control values.
+
+        Returns:
+        - A dictionary mapping each action to a tuple containing the best matching control and its score.
+        """
+        return await self.dispatcher.submit((directory, mode_name, list(actions)), size=len(actions))
+
+    def dispatcher_stats(self):
+        """
+        Return the amatch batching, latency and throughput counters.
+        """
+        return self.dispatcher.stats()
+
+    def _match_batch(self, requests):
+        """
+        Match a batch of (directory, mode_name, actions) requests, encoding the actions of all of them at once.
+
+        Returns:
+        - One result per request: the matches, or the exception raised for that request.
+        """
+        prepared = []
+        for directory, mode_name, actions in requests:
+            try:
+                all_controls = self.load_controls_from_json(directory, mode_name)
+                if not all_controls:
+                    raise ValueError(f"No control values found in the JSON file for mode '{mode_name}'.")
+                prepared.append((all_controls, actions, *self._match_static(all_controls, actions)))
+            except Exception as error:
+                prepared.append(error)
+
+        phrases = list(dict.fromkeys(action for request in prepared if not isinstance(request, Exception)
+                                     for action in request[3]))
+        rows = {phrase: row for row, phrase in enumerate(phrases)}
+        phrase_embeddings = self.encode_queries(phrases) if phrases else None
+
+        results = []
+        for request in prepared:
+            if isinstance(request, Exception):
+                results.append(request)
+                continue
+            all_controls, actions, matches, ambiguous = request
+            try:
+                if ambiguous:
+                    action_embeddings = phrase_embeddings[[rows[action] for action in ambiguous]]
+                    matches.update(self._match_embeddings_to_controls(all_controls, ambiguous, action_embeddings))
+                results.append({action: matches[action] for action in actions if action in matches})
+            except Exception as error:
+                results.append(error)
+        return results
+
+    @property
+    def static_nlp(self):
+        """
+        The spaCy pipeline of the cheap matching stage, loaded on first access when static_vectors is a name.
+        """
+        if self._static_nlp is None and self.static_vectors is not None:
+            if isinstance(self.static_vectors, str):
+                import spacy
+                self._static_nlp = spacy.load(self.static_vectors, exclude=["parser", "ner"])
+            else:
+                self._static_nlp = self.static_vectors
+        return self._static_nlp
+
+    def cascade_stats(self):
+        """
+        Return how many actions the cheap stage matched, how many fell back to the transformer and the fallback rate.
+        """
+        decided = self.static_match_count + self.fallback_count
+        return {
+            "static_matches": self.static_match_count,
+            "fallbacks": self.fallback_count,
+            "fallback_rate": self.fallback_count / decided if decided else 0.0,
+        }
+
+    def _static_features(self, texts):
+        """
+        Return the lemma key and the unit-length averaged word vector of each text, both over its content words.
+        """
+        nlp = self.static_nlp
+        # Only the components needed for lemmas; the word vectors come from the vocab
+        lemma_components = [name for name in ("tok2vec", "tagger", "attribute_ruler", "lemmatizer")
+                            if name in nlp.pipe_names]
+        with nlp.select_pipes(enable=lemma_components):
+            docs = list(nlp.pipe(texts))
+
+        keys = []
+        vectors = np.zeros((len(docs), nlp.vocab.vectors_length), dtype=np.float32)
+        for doc_idx, doc in enumerate(docs):
+            # Whitespace tokens are dropped, as encode_queries collapses whitespace
+            words = [token for token in doc if not token.is_space]
+            content = [token for token in words if not (token.is_stop or token.is_punct)] or words
+            keys.append(" ".join((token.lemma_ or token.text).lower() for token in content))
+            token_vectors = [token.vector for token in content if token.has_vector]
+            if token_vectors:
+                vectors[doc_idx] = np.mean(token_vectors, axis=0)
+        return keys, normalize_embeddings(vectors)
+
+    def _match_static(self, all_controls, actions):
+        """
+        Match the actions that the cheap stage can decide on its own.
+
+        Returns:
+        - A tuple (matches, ambiguous) of the matches in the match_actions_to_controls format and the list of
+          actions left for the transformer. Every action is ambiguous when static_vectors is None.
+        """
+        if self.static_vectors is None or not actions:
+            return {}, list(actions)
+
+        missing = [control for control in dict.fromkeys(all_controls) if control not in self._static_controls]
+        if missing:
+            self._static_controls.update(zip(missing, zip(*self._static_features(missing))))
+        control_keys = {}
+        for control_idx, control in enumerate(all_controls):
+            control_keys.setdefault(self._static_controls[control][0], control_idx)
+        control_vectors = np.stack([self._static_controls[control][1] for control in all_controls])
+
+        action_keys, action_vectors = self._static_features(actions)
+        similarities = action_vectors @ control_vectors.T
+        matches, ambiguous = {}, []
+        for action_idx, action in enumerate(actions):
+            if action_keys[action_idx] in control_keys:
+                matches[action] = (all_controls[control_keys[action_keys[action_idx]]], 1.0)
+                continue
+            ranked, ranked_scores = rank_top_k(similarities[action_idx][np.newaxis], 2)
+            best_score = ranked_scores[0, 0]
+            runner_up_score = ranked_scores[0, 1] if len(all_controls) > 1 else -1.0
+            if best_score >= self.static_accept_threshold and best_score - runner_up_score >= self.static_margin:
+                matches[action] = (all_controls[ranked[0, 0]], float(best_score))
+            else:
+                ambiguous.append(action)
+        self.static_match_count += len(matches)
+        self.fallback_count += len(ambiguous)
+        return matches, ambiguous
+
+    def match_actions_to_controls_top_k(self, directory, mode_name, actions, top_k=5):
+        """
+        Rank the control values in a specific JSON file for each action entity.
+
+        Parameters:
+        - directory (str): Path to the directory containing the mode file.
+        - mode_name (str): The base name of the mode file to compare against.
+        - actions (list of str): List of actions to compare against control values.
+        - top_k (int): Maximum number of controls returned per action.
+
+        Returns:
+        - A dictionary mapping each action to a list of (control, cosine similarity score) tuples, best first.
+        """
+        all_controls = self.load_controls_from_json(directory, mode_name)
+        if not all_controls:
+            raise ValueError(f"No control values found in the JSON file for mode '{mode_name}'.")
+
+        control_embeddings = self.encode_controls(all_controls)
+        action_embeddings = self.encode_queries(actions)
+        ranked_indices = self.find_top_k(action_embeddings, control_embeddings, top_k=top_k)
+
+        return {actions[action_idx]: [(all_controls[control_idx], score) for control_idx, score in ranked]
+                for action_idx, ranked in ranked_indices.items()}
+
+    def build_catalog_index(self, index_dir='catalog_index', modes_directory='modes', poses_directory='poses/json',
+                            gestures_directory='gestures/json'):
+        """
+        Build the cross-mode catalog index of every control, pose name and gesture name, save it to index_dir
+        and use it for search_catalog. Only the mode files and directories that changed since the index
+        in index_dir was built are encoded again.
+
+        Parameters:
+        - index_dir (str): Directory the index is saved to.
+        - modes_directory (str): Directory of the mode files.
+        - poses_directory (str): Directory of the pose files.
+        - gestures_directory (str): Directory of the gesture files.
+
+        Returns:
+        - The memory-mapped CatalogIndex.
+        """
+        if self.projection_dimension is not None and self.projection is None:
+            self.fit_projection(modes_directory, poses_directory, gestures_directory)
+
+        previous = self.catalog_index
+        if previous is None and os.path.exists(os.path.join(index_dir, "metadata.json")):
+            try:
+                previous = CatalogIndex.load(index_dir)
+            except ValueError:
+                previous = None  # An incomplete index is rebuilt from scratch
+
+        def encode(texts):
+            embeddings = self.encode_controls(texts)
+            return self.projection.apply(embeddings) if self.projection is not None else embeddings
+
+        index = CatalogIndex.build(encode, modes_directory, poses_directory, gestures_directory,
+                                   previous=previous, model_id=self._catalog_model_id(), backend=self.search_backend,
+                                   backend_options=self.search_options, precision=self.embedding_precision)
+        index.save(index_dir)
+        return self.load_catalog_index(index_dir)
+
+    def fit_projection(self, modes_directory='modes', poses_directory='poses/json', gestures_directory='gestures/json'):
+        """
+        Fit the projection_dimension reduction on the embeddings of every control, pose name and gesture name,
+        and save it next to the model.
+
+        Returns:
+        - The EmbeddingProjection.
+        """
+        texts = [entry["text"] for source, (kind, _) in
+                 read_catalog_sources(modes_directory, poses_directory, gestures_directory).items()
+                 for entry in read_catalog_entries(source, kind)]
+        self.projection = EmbeddingProjection.fit(self.encode_controls(texts), self.projection_dimension,
+                                                  method=self.projection_method, model_id=self.model_id)
+        self.projection.save(projection_path(self.model_path, self.projection_dimension, self.projection_method))
+        return self.projection
+
+    def _catalog_model_id(self):
+        # Indexes built with a projection are only valid together with that projection
+        if self.projection is None:
+            return self.model_id
+        return hashlib.sha256(f"{self.model_id}:{self.projection.identity}".encode("utf8")).hexdigest()
+
+    def load_catalog_index(self, index_dir='catalog_index'):
+        """
+        Load a catalog index saved by build_catalog_index, memory-mapping its embedding matrix.
+        """
+        self.catalog_index = CatalogIndex.load(index_dir, backend=self.search_backend,
+                                               backend_options=self.search_options)
+        if self.catalog_index.model_id != self._catalog_model_id():
+            raise ValueError(f"The catalog index in '{index_dir}' was built with a different model or projection.")
+        return self.catalog_index
+
+    def search_catalog(self, actions, top_k=5):
+        """
+        Match actions against every control, pose and gesture of the catalog index at once, without naming a mode.
+
+        Parameters:
+        - actions (list of str): List of actions to search for.
+        - top_k (int): Maximum number of catalog entries returned per action.
+
+        Returns:
+        - A dictionary mapping each action to a list of (metadata, cosine similarity score) tuples, best first,
+          where metadata holds the kind, mode, pose_index, text and file of the entry.
+        """
+        if self.catalog_index is None:
+            raise ValueError("No catalog index loaded; call build_catalog_index or load_catalog_index first.")
+
+        action_embeddings = self.encode_queries(actions)
+        if self.projection is not None:
+            action_embeddings = self.projection.apply(action_embeddings)
+        ranked, ranked_scores = self.catalog_index.search(action_embeddings, top_k=top_k)
+
+        results = {}
+        for action, indices, scores in zip(actions, ranked, ranked_scores):
+            # Approximate backends pad missing results with -inf scores, which the threshold removes
+            keep = scores >= self.similarity_threshold
+            results[action] = [(self.catalog_index.metadata[idx], float(score))
+                               for idx, score in zip(indices[keep], scores[keep])]
+        return results
+
 
 if __name__ == "__main__":
     model_path = 'transformer_model'